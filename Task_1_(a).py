@@ -1,8 +1,8 @@
-# Importing necessary modules and functions from the desired library "Introduction to Algorithms" (4th edition)
-from dijkstra import dijkstra  # Import the dijkstra function from dijkstra.py
-from adjacency_list_graph import AdjacencyListGraph
+from csr_graph import CSRGraph  # Array-backed graph built once from the edge list
+from point_to_point import shortest_route  # Dijkstra with early exit for a single journey
+from station_index import StationIndex  # Hash-map lookup of normalised station names
 
-# Step 1: The first step is to create the graph (tube network) using AdjencyListGraph class
+# Step 1: The first step is to create the graph (tube network) using the CSRGraph class
 vertices = ['A', 'B', 'C', 'D', 'E']  # Available stations
 edges = [
     ('A', 'B', 8),  # A to B- 8 minutes
@@ -12,34 +12,31 @@ edges = [
     ('D', 'E', 1)   # D to E-1 minute
 ]
 
-# Set the graph with 5 vertices, directed=False, weighted=True
-graph = AdjacencyListGraph(len(vertices), directed=False, weighted=True)
+index = StationIndex(vertices)  # Station IDs are positions in vertices
 
-# Put the edges into the graph
-for edge in edges:
-    graph.insert_edge(vertices.index(edge[0]), vertices.index(edge[1]), edge[2])
+# Set the graph with 5 vertices, directed=False, weighted=True, and put the edges into it
+graph = CSRGraph.from_edges(
+    len(vertices),
+    [(index.find(edge[0]), index.find(edge[1]), edge[2]) for edge in edges],
+    directed=False, weighted=True
+)
 
 # Step 3: Get the user input for source and destination stations
 source_station = input(f"Enter the source station (Choose from {vertices}): ").upper()
 destination_station = input(f"Enter the destination station (Choose from {vertices}): ").upper()
 
-# Guarantee rational input
-if source_station not in vertices or destination_station not in vertices:
+# Guarantee rational input (names are compared after normalising case and whitespace)
+source_vertex = index.find(source_station)  # Obtain the index of the source station
+target_vertex = index.find(destination_station)  # Get the index of the destination station
+if source_vertex is None or target_vertex is None:
     print("Invalid station name(s). Please enter valid stations from the list.")
 else:
     # Step 4: Determine the shortest route from source to destination
-    source_vertex = vertices.index(source_station)  # Obtain the index of the source station
-    d, pi = dijkstra(graph, source_vertex)  # Call the imported Dijkstra function
+    duration, route = shortest_route(graph, source_vertex, target_vertex)  # Stops once the destination is settled
 
-    # Step 5: Rebuild the shortest path
-    target_vertex = vertices.index(destination_station)  # Get the index of the destination station
-    path = []
-    current_vertex = target_vertex
-
-    while current_vertex is not None:
-        path.insert(0, vertices[current_vertex])  # Insert each station at the beginning of the path list
-        current_vertex = pi[current_vertex]  # Go to the predecessor
+    # Step 5: Map the route back to station names
+    path = [vertices[vertex] for vertex in route]
 
     # Step 6: Show the shortest route and journey duration
-    print(f"Shortest path from {source_station} to {destination_station}: {' -> '.join(path)}")
-    print(f"Journey duration: {d[target_vertex]} minutes")
\ No newline at end of file
+    print(f"Shortest path from {vertices[source_vertex]} to {vertices[target_vertex]}: {' -> '.join(path)}")
+    print(f"Journey duration: {duration} minutes")
\ No newline at end of file
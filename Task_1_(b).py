@@ -1,15 +1,13 @@
-import time
-import random
 import matplotlib.pyplot as plt
-from adjacency_list_graph import AdjacencyListGraph  # Importing from the book "Introduction to Algorithms" (4th
-# edition)
+from benchmark import MODELS, fit_model, measure, save_results  # Seeded, warmed-up timing with perf_counter_ns
+from network_generator import random_network, to_adjacency_list_graph  # Edges sampled in bulk, then loaded at once
 from dijkstra import dijkstra  # Importing from the book "Introduction to Algorithms" (4th
 
 
 # edition)
 
 # Step 1: Create a random tube network with n stations and random journey durations
-def generate_random_tube_network(n, edge_probability=0.1, min_weight=1, max_weight=15):
+def generate_random_tube_network(n, edge_probability=0.1, min_weight=1, max_weight=15, seed=None):
     """
     Generate an artificial tube network with n stations and random journey durations.
     Arguments:
@@ -17,55 +15,60 @@ def generate_random_tube_network(n, edge_probability=0.1, min_weight=1, max_weig
         edge_probability -- probability of an edge (journey) existing between two stations
         min_weight -- minimum journey duration in minutes
         max_weight -- maximum journey duration in minutes
+        seed -- seed of the random generator, so every run measures the same networks
     Returns:
         graph -- the generated tube network as an adjacency list graph
     """
-    graph = AdjacencyListGraph(n, directed=False, weighted=True)
-    for u in range(n):
-        for v in range(u + 1, n):
-            if random.random() < edge_probability:
-                weight = random.randint(min_weight, max_weight)
-                graph.insert_edge(u, v, weight)
-    return graph
+    tails, heads, weights = random_network(n, edge_probability, min_weight, max_weight, seed)
+    return to_adjacency_list_graph(n, tails, heads, weights)
 
 
 # Step 2: Calculate the execution time of Dijkstra's algorithm
-def measure_execution_time(graph, source, repetitions=5):
+def measure_execution_time(graph, source, repetitions=7):
     """
     Measure the execution time for Dijkstra's algorithm on the tube network.
     Arguments:
         graph -- the tube network (AdjacencyListGraph)
         source -- the source station index
-        repetitions -- number of times to repeat for averaging
+        repetitions -- number of timed samples, taken after one warm-up run
     Returns:
-        average_time -- average execution time in milliseconds
+        timing -- dictionary with the median, p10 and p90 times in milliseconds and the peak memory
     """
-    total_time = 0
-    for _ in range(repetitions):
-        start_time = time.time()
-        dijkstra(graph, source)  # Use Dijkstra's algorithm
-        end_time = time.time()
-        total_time += (end_time - start_time) * 1000  # Change the time to milliseconds
-    return total_time / repetitions
+    return measure(lambda: dijkstra(graph, source), repeat=repetitions)  # Use Dijkstra's algorithm
 
 
-# Step 3: Determine the average execution time for various network sizes
+# Step 3: Determine the median execution time for various network sizes
 network_sizes = [100, 200, 300, 400, 500, 600, 700, 800, 900, 1000]
 execution_times = []
+results = []
 
 for n in network_sizes:
-    graph = generate_random_tube_network(n)  # Create network of size n
+    graph = generate_random_tube_network(n, seed=1828 + n)  # Create network of size n (the same one on every run)
     source_vertex = 0  # random starting station
-    avg_time = measure_execution_time(graph, source_vertex)  # Average time measurement
-    execution_times.append(avg_time)
-    print(f"Network size: {n}, Average execution time: {avg_time:.2f} ms")
+    timing = measure_execution_time(graph, source_vertex)  # Median time measurement
+    execution_times.append(timing)
+    results.append(dict(case="clrs-dijkstra", graph=f"random-{n}", V=n, E=graph.get_card_E(), **timing))
+    print(f"Network size: {n}, Median execution time: {timing['median_ms']:.2f} ms "
+          f"(p10 {timing['p10_ms']:.2f}, p90 {timing['p90_ms']:.2f}), peak memory {timing['peak_kib']:.0f} KiB")
+
+# Fit the medians against the expected O((V + E) log V)
+label, model = MODELS["single-source"]
+scale, r_squared = fit_model([(r["V"], r["E"], r["median_ms"]) for r in results], model)
+print(f"Fit against {label}: R^2 = {r_squared:.4f}")
+save_results({"results": results, "fits": [{"case": "clrs-dijkstra", "model": label, "scale_ms": scale,
+                                            "r_squared": r_squared}]}, "task_1b_benchmark.json")
 
 # Step 4: Plot results for empirical time complexity
+medians = [timing["median_ms"] for timing in execution_times]
 plt.figure(figsize=(10, 6))
-plt.plot(network_sizes, execution_times, marker='o', label='Execution Time')
+plt.plot(network_sizes, medians, marker='o', label='Median Execution Time')
+plt.fill_between(network_sizes, [timing["p10_ms"] for timing in execution_times],
+                 [timing["p90_ms"] for timing in execution_times], alpha=0.3, label='10th-90th percentile')
+plt.plot(network_sizes, [scale * model(r["V"], r["E"]) for r in results], linestyle='--',
+         label=f'Fitted O({label}), R^2 = {r_squared:.3f}')
 plt.xlabel('Network Size (Number of Stations)')
-plt.ylabel('Average Execution Time (ms)')
-plt.title('Average Execution Time vs Network Size')
+plt.ylabel('Median Execution Time (ms)')
+plt.title('Median Execution Time vs Network Size')
 plt.grid(True)
 plt.legend()
 plt.show()
@@ -1,12 +1,12 @@
-import time
-import random
 import matplotlib.pyplot as plt
-from adjacency_list_graph import AdjacencyListGraph  # From "Introduction to Algorithms" (4th edition)
-from dijkstra import dijkstra  # From "Introduction to Algorithms" (4th edition)
+from benchmark import MODELS, fit_model, measure, save_results  # Seeded, warmed-up timing with perf_counter_ns
+from csr_graph import CSRGraph
+from network_generator import random_network  # Edges sampled in bulk as arrays
+from stop_count import BitsetGraph, bfs_bitset, bfs_csr  # Breadth-first search for the number of stops
 
 
 # Step 1: The First step is to create a random tube network with n stations, where weights represent number of stops
-def generate_random_tube_network(n, edge_probability=0.1):
+def generate_random_tube_network(n, edge_probability=0.1, seed=None):
     """
     Generate an artificial tube network with n stations.
     Each edge weight is 1, representing one stop.
@@ -14,58 +14,77 @@ def generate_random_tube_network(n, edge_probability=0.1):
     Arguments:
         n -- number of stations (vertices)
         edge_probability -- probability of an edge (journey) existing between two stations
+        seed -- seed of the random generator, so every run measures the same networks
 
     Returns:
-        graph -- the generated tube network as an adjacency list graph
+        graph -- the generated tube network as a CSRGraph, built in bulk from the edge arrays
     """
-    graph = AdjacencyListGraph(n, directed=False, weighted=True)
-    for u in range(n):
-        for v in range(u + 1, n):
-            if random.random() < edge_probability:
-                weight = 1  # Weight is set o 1 to show one stop
-                graph.insert_edge(u, v, weight)
-    return graph
+    tails, heads, weights = random_network(n, edge_probability, 1, 1, seed)  # Weight is set to 1 to show one stop
+    return CSRGraph.from_arrays(n, tails, heads, weights)
 
 
-# Step 2: Determine the execution time of Dijkstra's algorithm
-def measure_execution_time(graph, source, repetitions=5):
+# Step 2: Determine the execution time of the stop-count search
+def measure_execution_time(graph, source, repetitions=7):
     """
-    Measure the execution time for Dijkstra's algorithm on the tube network.
+    Measure the execution time for the number-of-stops search on the tube network.
+    Every edge counts as one stop, so a breadth-first search gives the same distances as
+    Dijkstra's algorithm without a priority queue. The plain level-by-level BFS (bfs_csr) is
+    the O(V + E) algorithm whose growth is fitted; the bit-parallel, direction-optimising
+    bfs_bitset is timed alongside it for comparison.
 
     Arguments:
-        graph -- the tube network (AdjacencyListGraph)
+        graph -- the tube network (CSRGraph)
         source -- the source station index
-        repetitions -- number of times to repeat for averaging
+        repetitions -- number of timed samples, taken after one warm-up run
 
     Returns:
-        average_time -- average execution time in milliseconds
+        timing -- dictionary with the median, p10 and p90 times in milliseconds and the peak memory of bfs_csr
+        bitset_timing -- the same for bfs_bitset
     """
-    total_time = 0
-    for _ in range(repetitions):
-        start_time = time.time()
-        dijkstra(graph, source)  # Apply Dijkstra's algorithm
-        end_time = time.time()
-        total_time += (end_time - start_time) * 1000  # Convert to milliseconds
-    return total_time / repetitions
+    timing = measure(lambda: bfs_csr(graph, source), repeat=repetitions)  # Apply breadth-first search
+    bitset_graph = BitsetGraph(graph)  # Prepared once, outside the timing
+    return timing, measure(lambda: bfs_bitset(bitset_graph, source), repeat=repetitions)
 
 
-# Step 3: Find out the average execution time for various network sizes
+# Step 3: Find out the median execution time for various network sizes
 network_sizes = [1100, 1200, 1300, 1400, 1500, 1600, 1700, 1800, 1900, 2000]  # As per the specification
 execution_times = []
+bitset_times = []
+results = []
 
 for n in network_sizes:
-    graph = generate_random_tube_network(n, edge_probability=0.1)  # Make a network of size n
+    graph = generate_random_tube_network(n, edge_probability=0.1, seed=1828 + n)  # Make a network of size n
     source_vertex = 0  # Start from the first station
-    avg_time = measure_execution_time(graph, source_vertex)  # Compute average time
-    execution_times.append(avg_time)
-    print(f"Network size: {n}, Average execution time: {avg_time:.2f} ms")
+    timing, bitset_timing = measure_execution_time(graph, source_vertex)  # Compute median time
+    execution_times.append(timing)
+    bitset_times.append(bitset_timing)
+    results.append(dict(case="bfs", graph=f"random-{n}", V=n, E=graph.get_card_E(), **timing))
+    results.append(dict(case="bfs-bitset", graph=f"random-{n}", V=n, E=graph.get_card_E(), **bitset_timing))
+    print(f"Network size: {n}, Median execution time: {timing['median_ms']:.2f} ms "
+          f"(p10 {timing['p10_ms']:.2f}, p90 {timing['p90_ms']:.2f}), peak memory {timing['peak_kib']:.0f} KiB; "
+          f"bit-parallel BFS {bitset_timing['median_ms']:.2f} ms")
+
+# Fit the medians against the O(V + E) of a breadth-first search
+label, model = MODELS["bfs"]
+bfs_results = [r for r in results if r["case"] == "bfs"]
+scale, r_squared = fit_model([(r["V"], r["E"], r["median_ms"]) for r in bfs_results], model)
+print(f"Fit of bfs_csr against {label}: R^2 = {r_squared:.4f}")
+save_results({"results": results, "fits": [{"case": "bfs", "model": label, "scale_ms": scale,
+                                            "r_squared": r_squared}]}, "task_2b_benchmark.json")
 
 # Step 4: Lastly, Plot results for empirical time complexity
+medians = [timing["median_ms"] for timing in execution_times]
 plt.figure(figsize=(10, 6))
-plt.plot(network_sizes, execution_times, marker='o', label='Execution Time')
+plt.plot(network_sizes, medians, marker='o', label='Median Execution Time (BFS)')
+plt.fill_between(network_sizes, [timing["p10_ms"] for timing in execution_times],
+                 [timing["p90_ms"] for timing in execution_times], alpha=0.3, label='10th-90th percentile')
+plt.plot(network_sizes, [scale * model(r["V"], r["E"]) for r in bfs_results], linestyle='--',
+         label=f'Fitted O({label}), R^2 = {r_squared:.3f}')
+plt.plot(network_sizes, [timing["median_ms"] for timing in bitset_times], marker='s',
+         label='Bit-parallel direction-optimising BFS (not fitted)')
 plt.xlabel('Network Size (Number of Stations)')
-plt.ylabel('Average Execution Time (ms)')
-plt.title('Average Execution Time vs Network Size (Number of Stops)')
+plt.ylabel('Median Execution Time (ms)')
+plt.title('Median Execution Time vs Network Size (Number of Stops)')
 plt.grid(True)
 plt.legend()
 plt.show()
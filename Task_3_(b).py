@@ -1,58 +1,7 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-from dijkstra import dijkstra
-from adjacency_list_graph import AdjacencyListGraph
-
-# Step 1: Import London Underground Network Data
-data = pd.read_excel("London Underground Data.xlsx", header=None)
-data.columns = ["Line", "Station1", "Station2", "Duration"]
-
-# Ensure valid station names and remove NaN rows
-data = data.dropna(subset=["Station1", "Station2", "Duration"])
-data['Station1'] = data['Station1'].astype(str).str.strip()
-data['Station2'] = data['Station2'].astype(str).str.strip()
-
-# Extract unique stations and map them to indices
-stations = sorted(set(data['Station1']).union(set(data['Station2'])))
-station_to_index = {station: idx for idx, station in enumerate(stations)}
-n = len(stations)
-
-# Step 2: Initialize the graph for stops
-graph_stops = AdjacencyListGraph(n, directed=False, weighted=True)
-added_edges = set()
-
-for _, row in data.iterrows():
-    source = station_to_index[row['Station1']]
-    target = station_to_index[row['Station2']]
-
-    # Ensure the edge is added only once and weight is set to 1 for stops
-    if (source, target) not in added_edges and (target, source) not in added_edges:
-        graph_stops.insert_edge(source, target, 1)
-        added_edges.add((source, target))
-
-# Step 3: Calculate journey durations in terms of stops
-durations_stops = []  # To store all journey durations (in stops)
-paths_stops = {}  # To store paths for later identification of the longest path
-
-for source in range(n):  # For each station
-    distances, predecessors = dijkstra(graph_stops, source)  # Run Dijkstra’s algorithm
-    for target in range(source + 1, n):  # Only consider unique pairs (A->B, not B->A)
-        if distances[target] != float('inf'):  # Exclude unreachable pairs
-            durations_stops.append(distances[target])  # Store the journey duration
-            paths_stops[(source, target)] = (distances[target], predecessors)
-
-# Step 4: Plot histogram of journey durations (stops)
-plt.figure(figsize=(10, 6))
-plt.hist(durations_stops, bins=range(1, max(durations_stops) + 2), edgecolor='black')
-plt.xlabel("Journey Duration (Number of Stops)")
-plt.ylabel("Frequency")
-plt.title("Distribution of Journey Durations (Stops)")
-plt.show()
-
-# Step 5: Identify the longest journey (stops) and its path
-longest_duration_stops = max(durations_stops)
-longest_pair_stops = max(paths_stops, key=lambda pair: paths_stops[pair][0])  # Pair with longest duration
-longest_path_duration_stops, predecessors_stops = paths_stops[longest_pair_stops]
+from network_loader import load_network
+from all_pairs import analyse_all_pairs  # All-pairs sweep (parallel on large networks), summarised on the fly
+from stop_count import bfs_csr  # Breadth-first search counts stops without a priority queue
 
 
 # Function to reconstruct the path from predecessors
@@ -65,10 +14,51 @@ def reconstruct_path(predecessors, start, end):
     return path
 
 
-longest_path_indices_stops = reconstruct_path(predecessors_stops, longest_pair_stops[0], longest_pair_stops[1])
-longest_path_stations_stops = [stations[i] for i in longest_path_indices_stops]
+if __name__ == "__main__":  # Needed so the worker processes can import this script
+    # Step 1: Import London Underground Network Data (parsed once, then read from a binary snapshot)
+    network = load_network("London Underground Data.xlsx")
+    stations = network.stations
+    n = len(stations)
+
+    # Step 2: Initialize the station graph; stops are counted by BFS, so no separate weight-1 graph is needed
+    graph_stops = network.graph()
+
+    # Step 3: Calculate journey durations in terms of stops
+    # Only a histogram and the current longest journey are kept, not a predecessor list per pair
+    summary_stops = analyse_all_pairs(graph_stops, engine=bfs_csr)  # BFS from each station (serial: the network is small)
+    durations_stops, counts_stops = summary_stops.durations_and_counts()
+
+    # Step 4: Plot histogram of journey durations (stops)
+    plt.figure(figsize=(10, 6))
+    plt.hist(durations_stops, bins=range(1, summary_stops.longest_duration + 2), weights=counts_stops,
+             edgecolor='black')
+    plt.xlabel("Journey Duration (Number of Stops)")
+    plt.ylabel("Frequency")
+    plt.title("Distribution of Journey Durations (Stops)")
+    plt.show()
+
+    # Step 5: Identify the longest journey (stops) and its path
+    longest_duration_stops = summary_stops.longest_duration
+    longest_pair_stops = summary_stops.longest_pair  # Pair with longest duration
+    predecessors_stops = summary_stops.longest_predecessors
+
+    longest_path_indices_stops = reconstruct_path(predecessors_stops, longest_pair_stops[0], longest_pair_stops[1])
+    longest_path_stations_stops = [stations[i] for i in longest_path_indices_stops]
+
+    # Count the routes with as few stops: where there are several, BFS keeps the one through the
+    # lowest-numbered station, which is not always the one the original heap-based Dijkstra printed
+    distances_from_start, _ = bfs_csr(graph_stops, longest_pair_stops[0])
+    route_counts = [0] * n
+    route_counts[longest_pair_stops[0]] = 1
+    for station in sorted(range(n), key=lambda v: distances_from_start[v]):
+        for neighbour, _ in graph_stops.neighbors(station):
+            if distances_from_start[neighbour] == distances_from_start[station] + 1:
+                route_counts[neighbour] += route_counts[station]
+    equally_short = route_counts[longest_pair_stops[1]]
 
-# Display the longest journey details (stops)
-print(f"Longest journey duration (by stops): {longest_duration_stops} stops")
-print("Path for the longest journey (in order):")
-print(" -> ".join(longest_path_stations_stops))
\ No newline at end of file
+    # Display the longest journey details (stops)
+    print(f"Longest journey duration (by stops): {longest_duration_stops} stops")
+    print("Path for the longest journey (in order):")
+    print(" -> ".join(longest_path_stations_stops))
+    if equally_short > 1:
+        print(f"({equally_short} routes have this number of stops; ties are broken towards the lowest-numbered station)")
@@ -1,35 +1,30 @@
 
-import pandas as pd
 from adjacency_list_graph import AdjacencyListGraph
-from mst import kruskal  # Using the Kruskal's MST algorithm from the library ("Introduction to Algorithms" 4th edition)
+from network_loader import load_network
+from fast_mst import redundant_edges as non_mst_edges  # Array-based Kruskal with a union-find forest
 
 
 # Step 1: Load the data from the Excel file
 def load_data(file_path):
-    """Load journey data and prepare it for the graph."""
-    data = pd.read_excel(file_path, header=None)
-    data.columns = ['Line', 'Start_Station', 'End_Station', 'Duration']
-    data.dropna(subset=['Start_Station', 'End_Station', 'Duration'], inplace=True)
-    return data
+    """Load journey data and prepare it for the graph (parsed once, then read from a binary snapshot)."""
+    return load_network(file_path)
 
 
 # Step 2: Create the graph with all unique stations
-def create_graph(data):
+def create_graph(network):
     """Initialize the graph with vertices and edges based on the data."""
-    # Get unique stations from both Start_Station and End_Station columns
-    unique_stations = pd.concat([data['Start_Station'], data['End_Station']]).unique()
+    # Number the stations in the order the workbook first lists them, as Kruskal's tie-breaks depend on it
+    order = network.first_seen_order()
+    unique_stations = [network.stations[station] for station in order]
     graph = AdjacencyListGraph(len(unique_stations), directed=False, weighted=True)
 
     # Map each station to a unique index
     station_to_index = {station: idx for idx, station in enumerate(unique_stations)}
+    renumbered = {station: idx for idx, station in enumerate(order)}
 
-    # Add edges to the graph
-    for _, row in data.iterrows():
-        u = station_to_index[row['Start_Station']]
-        v = station_to_index[row['End_Station']]
-        weight = row['Duration']
-        if not graph.has_edge(u, v):  # Avoid duplicate edges
-            graph.insert_edge(u, v, weight)
+    # Add edges to the graph (the loader already keeps each station pair once)
+    for u, v, weight in network.edges():
+        graph.insert_edge(renumbered[u], renumbered[v], weight)
 
     return graph, station_to_index, unique_stations
 
@@ -37,10 +32,8 @@ def create_graph(data):
 # Step 3: Find redundant edges using Kruskal's MST algorithm
 def find_redundant_edges(graph):
     """Identify edges that are not part of the MST."""
-    mst_graph = kruskal(graph)  # Call the Kruskal's algorithm from the imported module
-    original_edges = set(graph.get_edge_list())
-    mst_edges = set(mst_graph.get_edge_list())
-    redundant_edges = original_edges - mst_edges
+    # Same tree as the CLRS kruskal (ties broken in the same order), without building it as a graph
+    redundant_edges = set(non_mst_edges(graph))
     return redundant_edges
 
 
@@ -0,0 +1,151 @@
+import os
+import time
+from multiprocessing import Pool
+import instrumentation
+from csr_graph import dijkstra_csr
+
+# Smallest graph the sweep spreads over a process pool by default: below this, starting the
+# pool and shipping the rows back costs more than the serial sweep (e.g. the 270-station tube).
+PARALLEL_MIN_VERTICES = 1000
+
+_graph = None  # the read-only graph, installed once in every worker process
+_engine = None  # the single-source function run on it
+
+
+def _init_worker(graph, engine, trace=False):
+    """Keep the graph in the worker, so tasks only carry a source index, and trace if the parent does."""
+    global _graph, _engine
+    _graph = graph
+    _engine = engine
+    if trace:
+        instrumentation.start_worker()
+
+
+def _sweep_source(source):
+    """Run the single-source engine from one source on the worker's graph, with the trace it made."""
+    distances, predecessors = _engine(_graph, source)
+    return source, distances, predecessors, instrumentation.collect()
+
+
+def all_pairs_rows(graph, processes=None, engine=dijkstra_csr):
+    """
+    Run a single-source engine from every vertex, spreading the sources across a process pool.
+    The graph is sent to each worker once when the pool starts, and the rows are streamed
+    back in source order, so callers see exactly what a serial loop would produce.
+    Scripts that call this must guard their main code with if __name__ == "__main__".
+    Arguments:
+        graph -- the network as a CSRGraph
+        processes -- number of worker processes (default: one per CPU core for graphs of at least
+                     PARALLEL_MIN_VERTICES vertices, otherwise 1; 1 runs serially)
+        engine -- module-level function (graph, source) -> (distances, predecessors),
+                  e.g. dijkstra_csr for journey times or stop_count.bfs_csr for stops
+    Yields:
+        (source, distances, predecessors) for source = 0, 1, ..., n - 1
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    n = graph.get_card_V()
+    if processes is None:
+        processes = (os.cpu_count() or 1) if n >= PARALLEL_MIN_VERTICES else 1
+    processes = min(processes, n)
+    if processes <= 1:
+        for source in range(n):
+            distances, predecessors = engine(graph, source)
+            yield source, distances, predecessors
+    else:
+        chunk_size = max(1, n // (processes * 4))  # a few chunks per worker to balance the load
+        trace = instrumentation.active
+        instrumentation.flush()  # forked workers must not inherit unwritten lines
+        with Pool(processes, initializer=_init_worker, initargs=(graph, engine, trace)) as pool:
+            for source, distances, predecessors, buckets in pool.imap(_sweep_source, range(n), chunk_size):
+                if trace:
+                    instrumentation.absorb(buckets)  # the workers' engine counters
+                yield source, distances, predecessors
+    if instrumentation.active:
+        # Includes the time the caller spends on each row, as the rows are streamed.
+        instrumentation.record("all-pairs", time.perf_counter_ns() - start, sources=n)
+
+
+class JourneySummary:
+    """
+    Streaming summary of all unique station pairs (source < target) that are connected.
+    Keeps a histogram of the journey durations and the longest journey seen so far, with the
+    predecessor row needed to rebuild its path, so memory stays O(V) instead of O(V^2).
+    The longest pair is the first one with the largest duration in source/target order, as in
+    the original scripts. Its path follows the engine's predecessors, so where several routes
+    are equally short it may differ from the one CLRS dijkstra's heap would pick.
+    """
+
+    def __init__(self):
+        self.histogram = {}  # journey duration -> number of pairs
+        self.pair_count = 0
+        self.longest_duration = None
+        self.longest_pair = None
+        self.longest_predecessors = None  # predecessor row of longest_pair[0]
+
+    def add_row(self, source, distances, predecessors):
+        """Fold in the distances from one source to every later target."""
+        histogram = self.histogram
+        longest = self.longest_duration
+        for target in range(source + 1, len(distances)):
+            distance = distances[target]
+            if distance != float('inf'):  # exclude unreachable pairs
+                histogram[distance] = histogram.get(distance, 0) + 1
+                self.pair_count += 1
+                if longest is None or distance > longest:  # strict, so the first longest pair is kept
+                    longest = distance
+                    self.longest_pair = (source, target)
+                    self.longest_predecessors = predecessors
+        self.longest_duration = longest
+
+    def durations_and_counts(self):
+        """Return the distinct durations in increasing order and how often each occurs (for plt.hist weights)."""
+        durations = sorted(self.histogram)
+        return durations, [self.histogram[duration] for duration in durations]
+
+
+def analyse_all_pairs(graph, processes=None, engine=dijkstra_csr):
+    """
+    Run the all-pairs sweep and summarise it on the fly.
+    Arguments:
+        graph -- the network as a CSRGraph
+        processes -- number of worker processes, as for all_pairs_rows
+        engine -- single-source function, as for all_pairs_rows
+    Returns:
+        summary -- JourneySummary with the histogram and the longest journey
+    """
+    summary = JourneySummary()
+    for source, distances, predecessors in all_pairs_rows(graph, processes, engine):
+        summary.add_row(source, distances, predecessors)
+    return summary
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from csr_graph import CSRGraph
+
+    random.seed(1828)
+    n = 1500
+    edge_list = [(u, v, random.randint(1, 15)) for u in range(n) for v in range(u + 1, n) if random.random() < 0.01]
+    graph = CSRGraph.from_edges(n, edge_list)
+
+    timings = {}
+    results = {}
+    for processes in sorted({1, 2, os.cpu_count() or 1}):
+        start = time.perf_counter()
+        results[processes] = [distances for _, distances, _ in all_pairs_rows(graph, processes)]
+        timings[processes] = time.perf_counter() - start
+        print(f"{processes} process(es): {timings[processes]:.2f} s, speed-up {timings[1] / timings[processes]:.2f}x")
+    if any(rows != results[1] for rows in results.values()):
+        raise RuntimeError("Parallel sweep does not match the serial sweep")
+
+    # The summary keeps the first longest pair in source/target order, like max() over the original pair dict.
+    pairs = {(source, target): distances[target] for source, distances in enumerate(results[1])
+             for target in range(source + 1, n) if distances[target] != float('inf')}
+    for processes in sorted({1, 2}):
+        summary = analyse_all_pairs(graph, processes)
+        if summary.longest_pair != max(pairs, key=pairs.get) or summary.pair_count != len(pairs):
+            raise RuntimeError(f"Summary with {processes} process(es) does not keep the first longest pair")
+    print(f"Summaries keep the first longest pair {summary.longest_pair} of {len(pairs)}")
@@ -0,0 +1,305 @@
+import heapq
+import time
+import weakref
+import instrumentation
+from csr_graph import dijkstra_csr
+from point_to_point import build_path
+
+_graphs = weakref.WeakKeyDictionary()  # network -> {metric: graph}, built on first use and dropped with the network
+
+
+def _arc_cost(G, u, v):
+    """Return the cheapest arc from u to v (the searches always take the cheapest of parallel arcs)."""
+    return min(G.weights[i] for i in range(G.offsets[u], G.offsets[u + 1]) if G.targets[i] == v)
+
+
+def _tree_path(toward, v):
+    """Follow a shortest-path tree rooted at the target from v to the target."""
+    path = [v]
+    while toward[path[-1]] is not None:
+        path.append(toward[path[-1]])
+    return path
+
+
+def _spur_search(G, spur, target, to_target, blocked, cut):
+    """
+    A* search from spur to target that avoids the blocked vertices and the arcs from spur to
+    the vertices in cut. The distances to the target in the full graph are a consistent lower
+    bound in the restricted one, so they guide the search and the target is final when popped.
+    Returns:
+        cost -- length of the spur path (float('inf') if there is none)
+        path -- station indices from spur to target (empty if there is none)
+    """
+    offsets, targets, weights = G.offsets, G.targets, G.weights
+    inf = float('inf')
+    d = {spur: 0}
+    pi = {spur: None}
+    done = set()
+    heap = [(to_target[spur], spur)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in done:  # stale entry
+            continue
+        if u == target:
+            break
+        done.add(u)
+        du = d[u]
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            if v in blocked or (u == spur and v in cut):
+                continue
+            dv = du + weights[i]
+            if dv < d.get(v, inf):
+                d[v] = dv
+                pi[v] = u
+                heapq.heappush(heap, (dv + to_target[v], v))
+    if target not in d:
+        return inf, []
+    return d[target], build_path(pi, target)
+
+
+def k_shortest_routes(G, source, target, k=3):
+    """
+    Find the k shortest loopless routes with Yen's algorithm, in increasing order of length.
+    Each new route deviates from an earlier one at a spur station: the route up to there is
+    kept, its stations are blocked, and so are the next arcs of the earlier routes that share
+    that prefix. Two things keep the spur searches cheap:
+    - one shortest-path tree towards the target is built per query and reused by every spur
+      search. Leaving the spur station by its cheapest open arc and then following the tree
+      is a lower bound on the spur path, so when that route avoids everything blocked it is
+      the spur path, with no search at all; otherwise the tree distances guide an A* search;
+    - only spur stations from the deviation point of the previous route on are tried
+      (Lawler's refinement), since earlier ones were tried when that route's parent was.
+    Arguments:
+        G -- the network as an undirected CSRGraph (network.graph("time") or ("stops"))
+        source -- index of the source station
+        target -- index of the destination station
+        k -- number of routes wanted
+    Returns:
+        routes -- up to k (length, station indices) pairs, shortest first
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    inf = float('inf')
+    to_target, toward = dijkstra_csr(G, target)  # the tree is rooted at the target: toward[v] is v's next station
+    if to_target[source] == inf or k < 1:
+        return []
+    routes = [(to_target[source], _tree_path(toward, source))]
+    deviations = [0]  # spur index at which each route left its parent
+    next_stations = {}  # route prefix (as a tuple) -> stations that accepted routes continue to from it
+    candidates = []
+    seen = set()
+    shortcuts = searches = 0
+
+    while True:
+        cost, path = routes[-1]
+        seen.add(tuple(path))
+        for j in range(len(path) - 1):
+            next_stations.setdefault(tuple(path[:j + 1]), set()).add(path[j + 1])
+        if len(routes) == k:
+            break
+
+        root_cost = 0
+        for j in range(deviations[-1]):
+            root_cost += _arc_cost(G, path[j], path[j + 1])
+        for i in range(deviations[-1], len(path) - 1):
+            spur = path[i]
+            blocked = set(path[:i])
+            cut = next_stations[tuple(path[:i + 1])]
+            # No spur path beats the cheapest allowed first arc followed by that station's tree
+            # path, so when that tree path avoids the blocked stations it is the spur path.
+            first, spur_cost = None, inf
+            for a in range(G.offsets[spur], G.offsets[spur + 1]):
+                v = G.targets[a]
+                if v not in blocked and v not in cut and G.weights[a] + to_target[v] < spur_cost:
+                    first, spur_cost = v, G.weights[a] + to_target[v]
+            tree_path = _tree_path(toward, first) if first is not None else []
+            if first is None or spur_cost == inf:
+                spur_path = []  # every way on from the spur is blocked
+            elif spur not in tree_path and blocked.isdisjoint(tree_path):
+                spur_path = [spur] + tree_path
+                shortcuts += 1
+            else:
+                spur_cost, spur_path = _spur_search(G, spur, target, to_target, blocked, cut)
+                searches += 1
+            if spur_path:
+                candidate = path[:i] + spur_path
+                if tuple(candidate) not in seen:
+                    seen.add(tuple(candidate))
+                    heapq.heappush(candidates, (root_cost + spur_cost, len(candidate), candidate, i))
+            root_cost += _arc_cost(G, spur, path[i + 1])
+
+        if not candidates:
+            break
+        cost, _, path, i = heapq.heappop(candidates)
+        routes.append((cost, path))
+        deviations.append(i)
+
+    if instrumentation.active:
+        instrumentation.record("k-shortest", time.perf_counter_ns() - start, routes=len(routes),
+                               spur_shortcuts=shortcuts, spur_searches=searches)
+    return routes
+
+
+def via_routes(G, source, target, k=3, stretch=1.25, max_sharing=0.8):
+    """
+    Find alternative routes through via stations, the way many journey planners offer them.
+    One tree from the source and one towards the target give, for every station v, the
+    shortest route through v in constant time: source -> v -> target. Stations are tried in
+    increasing order of that length, and a route is kept if it has no loop, is at most
+    stretch times the shortest route, and shares at most max_sharing of its length with
+    every route already kept. The routes are not always the k shortest, but they differ more.
+    Arguments:
+        G -- the network as an undirected CSRGraph (network.graph("time") or ("stops"))
+        source -- index of the source station
+        target -- index of the destination station
+        k -- largest number of routes wanted, including the shortest
+        stretch -- longest acceptable route, relative to the shortest
+        max_sharing -- largest fraction of a new route's length it may share with a kept route
+    Returns:
+        routes -- up to k (length, station indices) pairs, shortest first
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    from_source, pi = dijkstra_csr(G, source)
+    to_target, toward = dijkstra_csr(G, target)
+    best = from_source[target]
+    if best == float('inf') or k < 1:
+        return []
+
+    def arcs(path):
+        return {(min(a, b), max(a, b)): _arc_cost(G, a, b) for a, b in zip(path, path[1:])}
+
+    routes = [(best, build_path(pi, target))]
+    kept_arcs = [arcs(routes[0][1])]
+    seen = {tuple(routes[0][1])}
+    vias = sorted((from_source[v] + to_target[v], v) for v in range(G.get_card_V())
+                  if from_source[v] + to_target[v] <= stretch * best)
+    for cost, v in vias:
+        if len(routes) == k:
+            break
+        path = build_path(pi, v) + _tree_path(toward, v)[1:]
+        if tuple(path) in seen:
+            continue  # every station of one via route gives the same route
+        seen.add(tuple(path))
+        if len(set(path)) != len(path):
+            continue  # the two halves meet before v: the route has a loop
+        route_arcs = arcs(path)
+        if all(sum(c for arc, c in route_arcs.items() if arc in kept) <= max_sharing * cost for kept in kept_arcs):
+            routes.append((cost, path))
+            kept_arcs.append(route_arcs)
+
+    if instrumentation.active:
+        instrumentation.record("via-routes", time.perf_counter_ns() - start, routes=len(routes), vias=len(vias))
+    return routes
+
+
+def alternative_routes(source, target, k=3, metric="time", method="yen", network=None, **options):
+    """
+    Alternative routes between two stations of the network, by name or index.
+    Arguments:
+        source, target -- station names (matched as network.station_index().resolve does) or indices
+        k -- number of routes wanted
+        metric -- "time" (journey time in minutes) or "stops" (number of stops)
+        method -- "yen" for the k shortest loopless routes, "via" for via-station alternatives
+        network -- the Network (default: load_network())
+        options -- extra arguments of via_routes (stretch, max_sharing)
+    Returns:
+        routes -- up to k (length, station names) pairs, shortest first
+    """
+    if metric not in ("time", "stops"):
+        raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+    if method not in ("yen", "via"):
+        raise ValueError("Unknown method " + repr(method) + ", expected 'yen' or 'via'.")
+    if network is None:
+        from network_loader import load_network
+        network = load_network()
+    graphs = _graphs.setdefault(network, {})
+    if metric not in graphs:
+        graphs[metric] = network.graph(metric)
+    graph = graphs[metric]
+    index = network.station_index()
+    source, target = [index.resolve(station) if isinstance(station, str) else int(station)
+                      for station in (source, target)]
+    if method == "yen":
+        routes = k_shortest_routes(graph, source, target, k)
+    else:
+        routes = via_routes(graph, source, target, k, **options)
+    return [(cost, [network.stations[v] for v in path]) for cost, path in routes]
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    from benchmark import measure
+    from csr_graph import CSRGraph
+    from network_loader import load_network
+
+    def simple_paths(G, source, target):
+        """Every loopless route from source to target with its length, by depth-first search."""
+        found, path = [], [source]
+
+        def extend(u, cost):
+            if u == target:
+                found.append((cost, list(path)))
+                return
+            for v, weight in G.neighbors(u):
+                if v not in path:
+                    path.append(v)
+                    extend(v, cost + weight)
+                    path.pop()
+
+        extend(source, 0)
+        return sorted(found)
+
+    # Small random graphs, where every loopless route can be listed.
+    random.seed(1828)
+    for trial in range(200):
+        n = random.randint(2, 9)
+        edge_list = [(u, v, random.randint(1, 4)) for u in range(n) for v in range(u + 1, n) if random.random() < 0.45]
+        graph = CSRGraph.from_edges(n, edge_list)
+        source, target = random.randrange(n), random.randrange(n)
+        expected = simple_paths(graph, source, target)
+        routes = k_shortest_routes(graph, source, target, 10)
+        if [cost for cost, _ in routes] != [cost for cost, _ in expected[:10]]:
+            raise RuntimeError(f"Yen's routes have the wrong lengths in trial {trial}")
+        for cost, path in routes + via_routes(graph, source, target, 10, stretch=2):
+            if len(set(path)) != len(path) or path[0] != source or path[-1] != target or \
+                    sum(_arc_cost(graph, a, b) for a, b in zip(path, path[1:])) != cost:
+                raise RuntimeError(f"Route {path} is not a loopless route of length {cost} in trial {trial}")
+        if len({tuple(path) for _, path in routes}) != len(routes):
+            raise RuntimeError(f"Yen returned the same route twice in trial {trial}")
+    print("Yen's routes match an exhaustive search on 200 small graphs; via routes are valid")
+
+    network = load_network("London Underground Data.xlsx")
+    for method, label in (("yen", "k shortest (Yen)"), ("via", "via stations")):
+        print(f"\nWimbledon to Upminster, {label}:")
+        routes = alternative_routes("Wimbledon", "Upminster", 5, method=method, network=network)
+        for cost, path in routes:
+            detour = [station for station in path if station not in routes[0][1]]
+            print(f"    {cost:>5} minutes, {len(path) - 1} stops" + (f", via {detour[0]}" if detour else ""))
+
+    # The cached graphs go away with their network.
+    import gc
+    scratch = load_network("London Underground Data.xlsx")
+    alternative_routes("Bank", "Oval", 2, network=scratch)
+    cached = len(_graphs)
+    del scratch
+    gc.collect()
+    if len(_graphs) != cached - 1:
+        raise RuntimeError("alternative_routes keeps the graphs of a network that is no longer used")
+
+    # Cost of k = 1..10 routes on the full network, averaged over random station pairs.
+    n = network.get_card_V()
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(30)]
+    for metric in ("time", "stops"):
+        graph = network.graph(metric)
+        print(f"\nMedian time per query by {metric}, {len(pairs)} random pairs (ms):")
+        print(f"{'k':>4}{'Yen':>10}{'via':>10}")
+        for k in range(1, 11):
+            yen = measure(lambda: [k_shortest_routes(graph, s, t, k) for s, t in pairs], repeat=5, per=len(pairs))
+            via = measure(lambda: [via_routes(graph, s, t, k) for s, t in pairs], repeat=5, per=len(pairs))
+            print(f"{k:>4}{yen['median_ms']:>10.2f}{via['median_ms']:>10.2f}")
+        counters = instrumentation.traced(lambda: [k_shortest_routes(graph, s, t, 10) for s, t in pairs],
+                                          "k-shortest")[0]["buckets"]["k-shortest"]
+        print(f"k = 10: {counters['spur_shortcuts']} spur paths read off the target's tree, "
+              f"{counters['spur_searches']} needed a search")
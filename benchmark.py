@@ -0,0 +1,291 @@
+import gc
+import json
+import math
+import platform
+import random
+import time
+import tracemalloc
+import instrumentation
+from csr_graph import CSRGraph, dijkstra_csr
+from point_to_point import shortest_route
+from all_pairs import analyse_all_pairs
+from stop_count import bfs_csr
+from fast_mst import edge_arrays, kruskal_mask
+from network_generator import tube_network
+
+# Cost model of each case, as a function of the number of vertices and edges
+MODELS = {
+    "build": ("V + E", lambda V, E: V + E),
+    "single-source": ("(V + E) log V", lambda V, E: (V + E) * math.log2(max(V, 2))),
+    "point-to-point": ("(V + E) log V", lambda V, E: (V + E) * math.log2(max(V, 2))),
+    "bfs": ("V + E", lambda V, E: V + E),
+    "mst": ("E log E", lambda V, E: E * math.log2(max(E, 2))),
+    "all-pairs": ("V (V + E) log V", lambda V, E: V * (V + E) * math.log2(max(V, 2))),
+}
+
+
+def measure(func, repeat=7, warmup=1, min_sample_ns=200000, per=1):
+    """
+    Time a function with time.perf_counter_ns.
+    Fast functions are called several times per sample, so that every sample lasts at least
+    min_sample_ns and the clock resolution does not matter. Peak memory is measured with
+    tracemalloc in a separate run, since tracing slows the function down.
+    Arguments:
+        func -- function of no arguments to time
+        repeat -- number of timed samples
+        warmup -- number of untimed calls first (caches, lazy imports, memory pools)
+        min_sample_ns -- shortest acceptable sample in nanoseconds
+        per -- number of operations one call performs (times are reported per operation)
+    Returns:
+        result -- dictionary of median, p10, p90, min and max times in ms, and peak memory in KiB
+    """
+    for _ in range(warmup):
+        func()
+
+    # Calibrate the number of calls per sample.
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_sample_ns:
+            break
+        number *= 2
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()  # keep collections of earlier garbage out of the samples
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter_ns()
+            for _ in range(number):
+                func()
+            samples.append((time.perf_counter_ns() - start) / (number * per) / 1e6)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": percentile(samples, 50),
+        "p10_ms": percentile(samples, 10),
+        "p90_ms": percentile(samples, 90),
+        "min_ms": min(samples),
+        "max_ms": max(samples),
+        "samples": repeat,
+        "calls_per_sample": number,
+        "peak_kib": peak / 1024,
+    }
+
+
+def percentile(values, q):
+    """Return the q-th percentile of values, interpolating between the closest ranks."""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    low = math.floor(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def fit_model(points, model):
+    """
+    Least-squares fit of time = scale * model(V, E) through the origin.
+    Arguments:
+        points -- list of (V, E, time) measurements
+        model -- cost function of V and E
+    Returns:
+        scale -- fitted constant (time per unit of the model)
+        r_squared -- coefficient of determination of the fit (1 is a perfect fit)
+    """
+    xs = [model(V, E) for V, E, _ in points]
+    ys = [t for _, _, t in points]
+    scale = sum(x * y for x, y in zip(xs, ys)) / sum(x * x for x in xs)
+    mean = sum(ys) / len(ys)
+    residual = sum((y - scale * x) ** 2 for x, y in zip(xs, ys))
+    total = sum((y - mean) ** 2 for y in ys)
+    return scale, 1 - residual / total if total else 1.0
+
+
+def benchmark_graph(name, card_V, arrays, seed, repeat=7, all_pairs_limit=1000, queries=20, trace=None):
+    """
+    Run every benchmark case on one graph.
+    Arguments:
+        name -- label of the graph in the results
+        card_V, arrays -- the graph as a vertex count and (tails, heads, weights) edge arrays
+        seed -- seed for the choice of sources and query pairs
+        repeat -- number of timed samples per case
+        all_pairs_limit -- skip the all-pairs sweep on graphs with more vertices than this
+        queries -- number of point-to-point queries per sample
+        trace -- JSON-lines file to append an instrumented run of every case to (default: none);
+                 the run is separate from the timed samples, which are always untraced
+    Returns:
+        results -- one dictionary per case, with the counters of the instrumented run under
+                   "trace" if there was one
+    """
+    rng = random.Random(seed)
+    graph = CSRGraph.from_arrays(card_V, *arrays)
+    tails, heads, weights = edge_arrays(graph)
+    source = rng.randrange(card_V)
+    pairs = [(rng.randrange(card_V), rng.randrange(card_V)) for _ in range(queries)]
+
+    def point_to_point():
+        for s, t in pairs:
+            shortest_route(graph, s, t)
+
+    cases = [
+        ("build", lambda: CSRGraph.from_arrays(card_V, *arrays), 1),
+        ("single-source", lambda: dijkstra_csr(graph, source), 1),
+        ("point-to-point", point_to_point, queries),
+        ("bfs", lambda: bfs_csr(graph, source), 1),
+        ("mst", lambda: kruskal_mask(card_V, tails, heads, weights), 1),
+    ]
+    if card_V <= all_pairs_limit:
+        cases.append(("all-pairs", lambda: analyse_all_pairs(graph, processes=1), 1))
+
+    results = []
+    for case, func, per in cases:
+        sample_count = repeat if case != "all-pairs" else max(3, repeat // 2)
+        result = {"case": case, "graph": name, "V": card_V, "E": graph.get_card_E()}
+        result.update(measure(func, repeat=sample_count, warmup=0 if case == "all-pairs" else 1, per=per))
+        if trace:
+            records = instrumentation.traced(func, case, trace, graph=name, V=card_V, E=result["E"])
+            result["trace"] = records[0]["buckets"]
+        results.append(result)
+    return results
+
+
+def run_suite(sizes=(100, 200, 500, 1000, 2000, 5000, 10000, 20000), seed=1828, repeat=7,
+              all_pairs_limit=1000, real_network=True, trace=None):
+    """
+    Benchmark every case on seeded synthetic networks of the given sizes and on the real network,
+    and fit each case against its expected complexity over the synthetic sizes.
+    The synthetic networks are tube-like (see network_generator.tube_network), seeded per size.
+    With a trace file, every case (and loading the real network) is also run once instrumented
+    and its counters appended to the file, see benchmark_graph.
+    Returns:
+        report -- dictionary with "meta", "results" and "fits", ready for save_results
+    """
+    results = []
+    for n in sizes:
+        results.extend(benchmark_graph(f"synthetic-{n}", n, tube_network(n, seed=seed + n), seed + n,
+                                       repeat, all_pairs_limit, trace=trace))
+        print(f"Benchmarked synthetic network with {n} stations")
+    if real_network:
+        from network_loader import load_network
+        network = load_network()
+        if trace:
+            instrumentation.traced(load_network, "load", trace, graph="london-underground")
+        arrays = tuple(zip(*network.edges()))
+        results.extend(benchmark_graph("london-underground", network.get_card_V(), arrays, seed,
+                                       repeat, all_pairs_limit, trace=trace))
+        print("Benchmarked the London Underground network")
+
+    fits = []
+    for case, (label, model) in MODELS.items():
+        points = [(r["V"], r["E"], r["median_ms"]) for r in results
+                  if r["case"] == case and r["graph"].startswith("synthetic-")]
+        if len(points) >= 2:
+            scale, r_squared = fit_model(points, model)
+            fits.append({"case": case, "model": label, "scale_ms": scale, "r_squared": r_squared})
+
+    meta = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results, "fits": fits}
+
+
+def save_results(report, file_path):
+    """Write a benchmark report as JSON."""
+    with open(file_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def load_results(file_path):
+    """Read a benchmark report written by save_results."""
+    with open(file_path) as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, tolerance=0.10):
+    """
+    Compare two benchmark reports case by case.
+    Arguments:
+        baseline, current -- reports from run_suite or load_results
+        tolerance -- relative slow-down of the median that counts as a regression
+    Returns:
+        rows -- (case, graph, baseline ms, current ms, ratio, regressed) for every case in both reports
+    """
+    before = {(r["case"], r["graph"]): r["median_ms"] for r in baseline["results"]}
+    rows = []
+    for r in current["results"]:
+        key = (r["case"], r["graph"])
+        if key in before:
+            ratio = r["median_ms"] / before[key] if before[key] else float('inf')
+            rows.append((r["case"], r["graph"], before[key], r["median_ms"], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def print_report(report):
+    """Print the results and fits of a benchmark report as tables."""
+    print(f"{'Case':<16}{'Graph':<22}{'V':>7}{'E':>8}{'Median ms':>12}{'p10 ms':>11}{'p90 ms':>11}{'Peak KiB':>11}")
+    for r in report["results"]:
+        print(f"{r['case']:<16}{r['graph']:<22}{r['V']:>7}{r['E']:>8}{r['median_ms']:>12.4f}"
+              f"{r['p10_ms']:>11.4f}{r['p90_ms']:>11.4f}{r['peak_kib']:>11.1f}")
+    print()
+    for fit in report["fits"]:
+        print(f"{fit['case']:<16}fits {fit['model']:<18} scale {fit['scale_ms']:.3e} ms, R^2 = {fit['r_squared']:.4f}")
+
+
+# Testing
+if __name__ == "__main__":
+
+    import argparse
+    import os
+    import sys
+
+    parser = argparse.ArgumentParser(description="Benchmark the routing engines.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 500, 1000, 2000, 5000, 10000, 20000])
+    parser.add_argument("--seed", type=int, default=1828)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--all-pairs-limit", type=int, default=1000)
+    parser.add_argument("--no-real", action="store_true", help="skip the London Underground network")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--trace", help="JSON-lines file for the counters of one instrumented run per case")
+    args = parser.parse_args()
+
+    if args.trace and os.path.exists(args.trace):
+        os.remove(args.trace)  # the trace is appended to case by case
+    report = run_suite(args.sizes, args.seed, args.repeat, args.all_pairs_limit, not args.no_real, args.trace)
+    print()
+    print_report(report)
+    save_results(report, args.output)
+    print(f"\nSaved the results to {args.output}")
+
+    if args.trace:
+        print(f"\nInstrumented runs, saved to {args.trace}:")
+        instrumentation.print_summary(instrumentation.summarise(instrumentation.read_trace(args.trace),
+                                                                by=("graph", "phase")))
+
+    if args.compare:
+        rows = compare_results(load_results(args.compare), report, args.tolerance)
+        regressions = [row for row in rows if row[5]]
+        print(f"\nCompared {len(rows)} cases with {args.compare}:")
+        for case, graph, before, after, ratio, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            print(f"    {case:<16}{graph:<22}{before:>10.4f} -> {after:>10.4f} ms ({ratio:.2f}x){flag}")
+        sys.exit(1 if regressions else 0)
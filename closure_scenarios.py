@@ -0,0 +1,122 @@
+import os
+from multiprocessing import Pool
+from all_pairs import JourneySummary
+from csr_graph import dijkstra_csr
+
+_base = None  # the base graph, installed once in every worker process
+
+
+def _init_worker(graph):
+    """Keep the base graph in the worker, so tasks only carry a closure set."""
+    global _base
+    _base = graph
+
+
+def summarise(graph):
+    """Return the number of connected pairs, the mean and the longest journey of a graph."""
+    summary = JourneySummary()
+    for source in range(graph.get_card_V()):
+        distances, predecessors = dijkstra_csr(graph, source)
+        summary.add_row(source, distances, predecessors)
+    total = sum(duration * count for duration, count in summary.histogram.items())
+    mean = total / summary.pair_count if summary.pair_count else float('nan')
+    return summary.pair_count, mean, summary.longest_duration
+
+
+def _evaluate(scenario):
+    """Evaluate one scenario on a closed-edge view of the worker's base graph."""
+    name, sections = scenario
+    pairs, mean, longest = summarise(_base.without_edges(sections))
+    return name, len(sections), pairs, mean, longest
+
+
+def evaluate_scenarios(graph, scenarios, processes=None):
+    """
+    Evaluate many closure scenarios in parallel and rank them by their impact.
+    Each scenario runs on a view of the base graph that shares its structure and only copies
+    the flat weights array, so nothing like graph.copy() of linked lists is needed per scenario.
+    Scripts that call this must guard their main code with if __name__ == "__main__".
+    Arguments:
+        graph -- the network as an undirected CSRGraph
+        scenarios -- list of (name, sections) pairs, sections being (u, v) station pairs
+        processes -- number of worker processes (default: one per CPU core; 1 runs serially)
+    Returns:
+        results -- dictionaries sorted by lost connections, then increase in mean and longest journey
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    base_pairs, base_mean, base_longest = summarise(graph)
+
+    if processes <= 1:
+        _init_worker(graph)
+        rows = [_evaluate(scenario) for scenario in scenarios]
+    else:
+        with Pool(processes, initializer=_init_worker, initargs=(graph,)) as pool:
+            rows = pool.map(_evaluate, scenarios, max(1, len(scenarios) // (processes * 4)))
+
+    results = [{
+        "scenario": name,
+        "sections": count,
+        "lost pairs": base_pairs - pairs,
+        "mean change": mean - base_mean,
+        "longest change": longest - base_longest if longest is not None else float('nan'),
+    } for name, count, pairs, mean, longest in rows]
+    results.sort(key=lambda row: (-row["lost pairs"], -row["mean change"], -row["longest change"]))
+    return results
+
+
+def section_scenarios(network):
+    """One scenario per distinct section of the network."""
+    scenarios = []
+    for u, v, _ in network.edges():
+        scenarios.append((f"{network.stations[u]} -- {network.stations[v]}", [(u, v)]))
+    return scenarios
+
+
+def line_scenarios(network):
+    """
+    One scenario per line: close every station pair that only that line serves.
+    Pairs shared with another line stay open, since trains of the other line still run.
+    """
+    lines_of_pair = {}
+    for i in range(len(network.section_u)):
+        u, v = network.section_u[i], network.section_v[i]
+        lines_of_pair.setdefault((min(u, v), max(u, v)), set()).add(network.section_line[i])
+    scenarios = []
+    for index, line in enumerate(network.lines):
+        sections = [pair for pair, lines in lines_of_pair.items() if lines == {index}]
+        if sections:
+            scenarios.append((f"{line} line", sections))
+    return scenarios
+
+
+def print_table(results, limit=None):
+    """Print ranked scenario results as a table."""
+    print(f"{'Rank':>4}  {'Scenario':<50}{'Sections':>9}{'Lost pairs':>11}{'Mean change':>13}{'Longest change':>16}")
+    for rank, row in enumerate(results[:limit], start=1):
+        print(f"{rank:>4}  {row['scenario'][:49]:<50}{row['sections']:>9}{row['lost pairs']:>11}"
+              f"{row['mean change']:>+13.2f}{row['longest change']:>+16.1f}")
+
+
+# Testing
+if __name__ == "__main__":
+
+    import time
+    from adjacency_list_graph import AdjacencyListGraph
+    from mst import kruskal
+    from network_loader import load_network
+
+    network = load_network("London Underground Data.xlsx")
+    graph = network.graph("time")
+
+    # The redundant sections of Task 4(b): everything off the minimum spanning tree.
+    tree_graph = AdjacencyListGraph(network.get_card_V(), directed=False, weighted=True)
+    for u, v, weight in network.edges():
+        tree_graph.insert_edge(u, v, weight)
+    redundant = sorted(set(tree_graph.get_edge_list()) - set(kruskal(tree_graph).get_edge_list()))
+
+    scenarios = section_scenarios(network) + line_scenarios(network) + [("MST-redundant sections", redundant)]
+    start = time.perf_counter()
+    results = evaluate_scenarios(graph, scenarios)
+    print(f"Evaluated {len(scenarios)} scenarios in {time.perf_counter() - start:.1f} s")
+    print_table(results, limit=25)
@@ -0,0 +1,374 @@
+import heapq
+import pickle
+from collections import OrderedDict
+from csr_graph import CSRGraph
+
+
+class ContractionHierarchy:
+    """
+    Preprocessed station graph for fast route queries.
+    Every vertex has a rank (its position in the contraction order). The upward graph holds,
+    for each vertex, the original edges and shortcuts that lead to higher-ranked vertices; a
+    query meets in the middle by searching upward from both the source and the target.
+    Shortcuts remember the vertex they bypass, so full routes can be unpacked.
+    """
+
+    def __init__(self, rank, upward, middle, max_spaces=4096):
+        """
+        Arguments:
+            rank -- rank[v] is the position of v in the contraction order
+            upward -- directed CSRGraph of the arcs from each vertex to higher-ranked vertices
+            middle -- dictionary mapping a shortcut (u, w) with u < w to the vertex it bypasses
+            max_spaces -- number of upward search spaces kept, least recently used dropped
+                          first (0 keeps none)
+        """
+        self.rank = rank
+        self.upward = upward
+        self.middle = middle
+        self.max_spaces = max_spaces
+        self.spaces = OrderedDict()  # vertex -> its stalled upward search space, filled by upward_space
+
+    def get_card_V(self):
+        """Return the number of vertices in the hierarchy."""
+        return self.upward.get_card_V()
+
+    def shortcut_count(self):
+        """Return the number of shortcuts added by the preprocessing."""
+        return len(self.middle)
+
+    def save(self, file_path):
+        """Serialise the hierarchy (plain arrays and a dictionary) to a file."""
+        upward = self.upward
+        state = {"rank": self.rank, "offsets": upward.offsets, "targets": upward.targets,
+                 "weights": upward.weights, "middle": self.middle}
+        with open(file_path, "wb") as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(file_path):
+        """Load a hierarchy written by save."""
+        with open(file_path, "rb") as file:
+            state = pickle.load(file)
+        upward = CSRGraph(len(state["rank"]), state["offsets"], state["targets"], state["weights"], directed=True)
+        return ContractionHierarchy(state["rank"], upward, state["middle"])
+
+    def _upward_search(self, d, pi, heap, best, other):
+        """Settle the top of one side's heap and relax its upward arcs. Returns the updated best meeting."""
+        offsets, targets, weights = self.upward.offsets, self.upward.targets, self.upward.weights
+        du, u = heapq.heappop(heap)
+        if du > d[u]:  # stale entry
+            return best
+        if u in other and du + other[u] < best[0]:
+            best = (du + other[u], u)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            dv = du + weights[i]
+            if v not in d or dv < d[v]:
+                d[v] = dv
+                pi[v] = u
+                heapq.heappush(heap, (dv, v))
+        return best
+
+    def _query(self, source, target):
+        """Run the two upward searches and return (distance, meeting vertex, forward pi, backward pi)."""
+        d = ({source: 0}, {target: 0})
+        pi = ({source: None}, {target: None})
+        heaps = ([(0, source)], [(0, target)])
+        best = (float('inf'), None)
+        while heaps[0] or heaps[1]:
+            # A side can stop once its smallest key cannot beat the best meeting found so far.
+            for side in (0, 1):
+                if heaps[side] and heaps[side][0][0] >= best[0]:
+                    heaps[side].clear()
+            for side in (0, 1):
+                if heaps[side]:
+                    best = self._upward_search(d[side], pi[side], heaps[side], best, d[1 - side])
+        return best[0], best[1], pi[0], pi[1]
+
+    def distance(self, source, target):
+        """Return the shortest-path distance from source to target (float('inf') if unreachable)."""
+        return self._query(source, target)[0]
+
+    def route(self, source, target):
+        """
+        Answer a station-to-station query.
+        Arguments:
+            source -- index of the source station
+            target -- index of the destination station
+        Returns:
+            distance -- length of the shortest route (float('inf') if the target is unreachable)
+            path -- station indices from source to target, with shortcuts unpacked
+        """
+        distance, meeting, forward, backward = self._query(source, target)
+        if meeting is None:
+            return float('inf'), []
+        # Hierarchy-level path: source up to the meeting vertex, then down to the target.
+        up = []
+        v = meeting
+        while v is not None:
+            up.append(v)
+            v = forward[v]
+        up.reverse()
+        v = backward[meeting]
+        while v is not None:
+            up.append(v)
+            v = backward[v]
+        path = [source]
+        for a, b in zip(up, up[1:]):
+            self._unpack(a, b, path)
+        return distance, path
+
+    def upward_space(self, source):
+        """
+        Run a complete upward search from source (no meeting test) and return the settled
+        vertices with their upward distances as a list of (vertex, distance) pairs.
+        Stall-on-demand: a vertex that a higher-ranked vertex already reaches more cheaply
+        cannot lie on a shortest up-down route, so it is left out and not expanded.
+        Up to max_spaces search spaces are kept, since batches tend to ask about the same
+        stations again; the least recently used is dropped first, like RouteCache's trees.
+        """
+        if source in self.spaces:
+            self.spaces.move_to_end(source)
+            return self.spaces[source]
+        offsets, targets, weights = self.upward.offsets, self.upward.targets, self.upward.weights
+        d = {source: 0}
+        heap = [(0, source)]
+        space = []
+        while heap:
+            du, u = heapq.heappop(heap)
+            if du > d[u]:  # stale entry
+                continue
+            first, last = offsets[u], offsets[u + 1]
+            # The graph is undirected, so u's upward arcs are also the arcs down into u.
+            stalled = False
+            for i in range(first, last):
+                v = targets[i]
+                if v in d and d[v] + weights[i] < du:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            space.append((u, du))
+            for i in range(first, last):
+                v = targets[i]
+                dv = du + weights[i]
+                if v not in d or dv < d[v]:
+                    d[v] = dv
+                    heapq.heappush(heap, (dv, v))
+        if self.max_spaces > 0:
+            self.spaces[source] = space
+            if len(self.spaces) > self.max_spaces:
+                self.spaces.popitem(last=False)  # least recently used first
+        return space
+
+    def many_to_many(self, origins, destinations):
+        """
+        Bucket-based many-to-many query: every shortest route climbs from its origin and
+        descends to its destination through its highest-ranked vertex, so one upward search
+        per destination fills buckets at the vertices it reaches, and one upward search per
+        origin scans those buckets. That is len(origins) + len(destinations) small searches
+        instead of one full Dijkstra per origin. The graph is undirected, so one search space
+        serves a station both as an origin and as a destination.
+        Arguments:
+            origins -- list of source station indices
+            destinations -- list of target station indices
+        Returns:
+            table -- list of rows, table[i][j] = distance from origins[i] to destinations[j]
+        """
+        buckets = {}
+        for j, target in enumerate(destinations):
+            for v, dv in self.upward_space(target):
+                buckets.setdefault(v, []).append((j, dv))
+        table = []
+        for source in origins:
+            row = [float('inf')] * len(destinations)
+            for v, dv in self.upward_space(source):
+                for j, dt in buckets.get(v, ()):
+                    if dv + dt < row[j]:
+                        row[j] = dv + dt
+            table.append(row)
+        return table
+
+    def _unpack(self, a, b, path):
+        """Append the original vertices between a (already on the path) and b, followed by b."""
+        stack = [(a, b)]
+        while stack:
+            a, b = stack.pop()
+            m = self.middle.get((a, b) if a < b else (b, a))
+            if m is None:  # an original edge
+                path.append(b)
+            else:  # expand a -> m first, then m -> b
+                stack.append((m, b))
+                stack.append((a, m))
+
+
+def _witness_search(adj, source, excluded, limit, max_settled):
+    """
+    Bounded Dijkstra over the remaining graph that ignores the vertex being contracted.
+    Returns the distances found; vertices beyond limit or max_settled are simply not reached.
+    """
+    d = {source: 0}
+    heap = [(0, source)]
+    settled = 0
+    while heap and settled < max_settled:
+        du, u = heapq.heappop(heap)
+        if du > d[u]:
+            continue
+        if du > limit:
+            break
+        settled += 1
+        for v, weight in adj[u].items():
+            if v == excluded:
+                continue
+            dv = du + weight
+            if v not in d or dv < d[v]:
+                d[v] = dv
+                heapq.heappush(heap, (dv, v))
+    return d
+
+
+def _shortcuts(adj, v, max_settled):
+    """Return the shortcuts (u, w, weight) needed if v were contracted now."""
+    neighbours = list(adj[v].items())
+    shortcuts = []
+    for i, (u, weight_u) in enumerate(neighbours):
+        later = neighbours[i + 1:]
+        if not later:
+            break
+        limit = weight_u + max(weight for _, weight in later)
+        d = _witness_search(adj, u, v, limit, max_settled)
+        for w, weight_w in later:
+            cost = weight_u + weight_w
+            if d.get(w, float('inf')) > cost:  # no path avoiding v is as short
+                shortcuts.append((u, w, cost))
+    return shortcuts
+
+
+def build_contraction_hierarchy(G, max_settled=64):
+    """
+    Contract the vertices of an undirected graph one at a time, in order of importance.
+    The importance of a vertex is its edge difference (shortcuts needed minus edges removed)
+    plus the number of neighbours already contracted, kept up to date lazily.
+    Arguments:
+        G -- the station graph as an undirected CSRGraph
+        max_settled -- settle limit of each witness search (a lower limit only adds shortcuts)
+    Returns:
+        ch -- the ContractionHierarchy
+    """
+    if G.is_directed():
+        raise RuntimeError("Contraction hierarchy needs an undirected graph.")
+
+    card_V = G.get_card_V()
+    # Remaining graph as dictionaries, keeping the lightest of any parallel edges.
+    adj = [dict() for _ in range(card_V)]
+    for u in range(card_V):
+        for v, weight in G.neighbors(u):
+            if v not in adj[u] or weight < adj[u][v]:
+                adj[u][v] = weight
+    middle = {}
+    contracted_neighbours = [0] * card_V
+
+    def importance(v):
+        return len(_shortcuts(adj, v, max_settled)) - len(adj[v]) + contracted_neighbours[v]
+
+    heap = [(importance(v), v) for v in range(card_V)]
+    heapq.heapify(heap)
+    rank = [0] * card_V
+    up_edges = []
+    order = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        # Lazy update: if v's importance has grown past the next candidate, try again later.
+        priority = importance(v)
+        if heap and priority > heap[0][0]:
+            heapq.heappush(heap, (priority, v))
+            continue
+
+        for u, w, cost in _shortcuts(adj, v, max_settled):
+            if w not in adj[u] or cost < adj[u][w]:
+                adj[u][w] = cost
+                adj[w][u] = cost
+                middle[(u, w) if u < w else (w, u)] = v
+        rank[v] = order
+        order += 1
+        for u, weight in adj[v].items():
+            up_edges.append((v, u, weight))  # every remaining neighbour is ranked higher than v
+            del adj[u][v]
+            contracted_neighbours[u] += 1
+        adj[v] = {}
+
+    upward = CSRGraph.from_edges(card_V, up_edges, directed=True)
+    return ContractionHierarchy(rank, upward, middle)
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from csr_graph import dijkstra_csr
+    from network_loader import load_network
+    from point_to_point import shortest_route
+
+    def compare(name, graph, ch, pairs):
+        """Check the hierarchy against Dijkstra and report the mean latency per query."""
+        sources = sorted(set(source for source, _ in pairs))
+        reference = {source: dijkstra_csr(graph, source)[0] for source in sources}
+        for source, target in pairs:
+            distance, path = ch.route(source, target)
+            if distance != reference[source][target]:
+                raise RuntimeError(f"{name}: {source} -> {target} gave {distance}, expected {reference[source][target]}")
+            if path and sum(graph.find_weight(a, b) for a, b in zip(path, path[1:])) != distance:
+                raise RuntimeError(f"{name}: unpacked route for {source} -> {target} does not match its length")
+
+        start = time.perf_counter()
+        for source, target in pairs:
+            shortest_route(graph, source, target)
+        dijkstra_time = (time.perf_counter() - start) / len(pairs) * 1e6
+        start = time.perf_counter()
+        for source, target in pairs:
+            ch.distance(source, target)
+        ch_time = (time.perf_counter() - start) / len(pairs) * 1e6
+        print(f"{name}: {len(pairs)} queries agree, {ch.shortcut_count()} shortcuts, "
+              f"Dijkstra {dijkstra_time:.1f} us/query, CH {ch_time:.1f} us/query")
+
+    random.seed(1828)
+
+    # Step 1: Load the network
+    network = load_network("London Underground Data.xlsx")
+    stations = network.stations
+    tube = network.graph("time")
+
+    # Step 2: Offline preprocessing for both metrics, written to disk
+    start = time.perf_counter()
+    build_contraction_hierarchy(tube).save("tube_time.ch")
+    build_contraction_hierarchy(tube.with_unit_weights()).save("tube_stops.ch")
+    print(f"Preprocessing took {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Step 3: Load the hierarchies and compare them with plain Dijkstra
+    pairs = [(random.randrange(len(stations)), random.randrange(len(stations))) for _ in range(2000)]
+    compare("Journey time", tube, ContractionHierarchy.load("tube_time.ch"), pairs)
+    compare("Number of stops", tube.with_unit_weights(), ContractionHierarchy.load("tube_stops.ch"), pairs)
+
+    # Step 4: A larger, tube-like synthetic network: one long line plus short-range interchanges
+    n = 3000
+    edge_list = [(v, v + 1, random.randint(1, 15)) for v in range(n - 1)]
+    chords = set()
+    while len(chords) < n // 3:
+        a = random.randrange(n - 50)
+        chords.add((a, a + random.randint(2, 50)))
+    edge_list += [(u, v, random.randint(1, 15)) for u, v in chords]
+    synthetic = CSRGraph.from_edges(n, edge_list)
+    start = time.perf_counter()
+    synthetic_ch = build_contraction_hierarchy(synthetic)
+    print(f"Synthetic preprocessing (n = {n}) took {(time.perf_counter() - start) * 1000:.1f} ms")
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(2000)]
+    compare(f"Synthetic network (n = {n})", synthetic, synthetic_ch, pairs)
+
+    # A bounded search-space cache gives the same tables and never holds more than its limit.
+    limited = ContractionHierarchy(synthetic_ch.rank, synthetic_ch.upward, synthetic_ch.middle, max_spaces=100)
+    origins = random.sample(range(n), 300)
+    if limited.many_to_many(origins, origins[:50]) != synthetic_ch.many_to_many(origins, origins[:50]) \
+            or len(limited.spaces) > 100:
+        raise RuntimeError("A bounded search-space cache changes the many-to-many table or outgrows its limit")
+    print(f"Many-to-many with at most 100 cached search spaces matches the default cache of {len(synthetic_ch.spaces)}")
@@ -0,0 +1,255 @@
+import heapq
+import time
+from array import array
+import instrumentation
+from adjacency_list_graph import Edge  # From "Introduction to Algorithms" (4th edition)
+
+
+def weight_array(values):
+    """Pack weights into an integer array when they are all integers (e.g. stops), otherwise into doubles."""
+    values = list(values)
+    if all(isinstance(w, int) for w in values):
+        return array('q', values)
+    return array('d', values)
+
+
+class CSRGraph:
+    """
+    Frozen, array-backed graph in compressed-sparse-row form.
+    The arcs leaving vertex u are targets[offsets[u]:offsets[u + 1]] with the matching weights,
+    so a traversal is a flat scan over contiguous arrays instead of a walk over linked lists of
+    Edge objects. An undirected edge is stored as two arcs, exactly like AdjacencyListGraph.
+    """
+
+    def __init__(self, card_V, offsets, targets, weights, directed=False, weighted=True):
+        """
+        Wrap prebuilt CSR arrays. Use from_edges or from_adjacency_list_graph to build one.
+        Arguments:
+            card_V -- number of vertices
+            offsets -- array of card_V + 1 arc offsets
+            targets -- array of arc heads
+            weights -- array of arc weights, parallel to targets
+            directed -- boolean indicating whether the graph is directed
+            weighted -- boolean indicating whether edges are weighted
+        """
+        self.card_V = card_V
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.directed = directed
+        self.weighted = weighted
+        self.card_E = len(targets) if directed else len(targets) // 2
+        self.closed = frozenset()  # indices of the arcs closed in a without_edges view
+
+    @classmethod
+    def from_edges(cls, card_V, edges, directed=False, weighted=True):
+        """
+        Build the graph once from an edge list with a counting sort on the tail vertex.
+        Arguments:
+            card_V -- number of vertices
+            edges -- iterable of (u, v, weight) tuples, or (u, v) tuples if unweighted
+            directed -- boolean indicating whether the graph is directed
+            weighted -- boolean indicating whether edges are weighted
+        Returns:
+            graph -- the CSRGraph
+        """
+        tails = array('i')
+        heads = array('i')
+        costs = []
+        for edge in edges:
+            tails.append(edge[0])
+            heads.append(edge[1])
+            costs.append(edge[2] if weighted else 1)
+        return cls.from_arrays(card_V, tails, heads, costs, directed, weighted)
+
+    @classmethod
+    def from_arrays(cls, card_V, tails, heads, costs, directed=False, weighted=True):
+        """
+        Build the graph in bulk from parallel edge arrays (lists, arrays or memoryviews).
+        Arguments:
+            card_V -- number of vertices
+            tails, heads -- endpoints of every edge
+            costs -- weight of every edge
+            directed -- boolean indicating whether the graph is directed
+            weighted -- boolean indicating whether edges are weighted
+        Returns:
+            graph -- the CSRGraph
+        """
+        start = time.perf_counter_ns() if instrumentation.active else 0
+        if not directed:
+            # Store each undirected edge as two arcs, one right after the other.
+            arc_tails = array('i', bytes(8 * len(tails)))
+            arc_heads = array('i', bytes(8 * len(tails)))
+            arc_costs = [0] * (2 * len(tails))
+            for i in range(len(tails)):
+                u, v = tails[i], heads[i]
+                if u == v:
+                    raise RuntimeError("Cannot insert self-loop (" + str(u) + ", " + str(v) + ") into undirected graph")
+                arc_tails[2 * i] = arc_heads[2 * i + 1] = u
+                arc_heads[2 * i] = arc_tails[2 * i + 1] = v
+                arc_costs[2 * i] = arc_costs[2 * i + 1] = costs[i]
+            tails, heads, costs = arc_tails, arc_heads, arc_costs
+
+        # Count the out-degree of every vertex, then turn the counts into offsets.
+        offsets = array('i', bytes(4 * (card_V + 1)))
+        for u in tails:
+            offsets[u + 1] += 1
+        for u in range(card_V):
+            offsets[u + 1] += offsets[u]
+
+        # Place every arc in its row, keeping the order in which the edges were given.
+        position = offsets[:-1]
+        targets = array('i', bytes(4 * len(heads)))
+        weights = weight_array(costs)
+        for i in range(len(tails)):
+            slot = position[tails[i]]
+            targets[slot] = heads[i]
+            weights[slot] = costs[i]
+            position[tails[i]] = slot + 1
+
+        if instrumentation.active:
+            instrumentation.record("build", time.perf_counter_ns() - start, vertices=card_V, arcs=len(targets))
+        return cls(card_V, offsets, targets, weights, directed, weighted)
+
+    @classmethod
+    def from_adjacency_list_graph(cls, G):
+        """Freeze an AdjacencyListGraph, keeping the order of its adjacency lists."""
+        card_V = G.get_card_V()
+        weighted = G.is_weighted()
+        offsets = array('i', [0])
+        targets = array('i')
+        weights = []
+        for u in range(card_V):
+            for edge in G.get_adj_list(u):
+                targets.append(edge.get_v())
+                weights.append(edge.get_weight() if weighted else 1)
+            offsets.append(len(targets))
+        return cls(card_V, offsets, targets, weight_array(weights), G.is_directed(), weighted)
+
+    def get_card_V(self):
+        """Return the number of vertices in this graph."""
+        return self.card_V
+
+    def get_card_E(self):
+        """Return the number of edges in this graph."""
+        return self.card_E
+
+    def is_directed(self):
+        """Return a boolean indicating whether this graph is directed."""
+        return self.directed
+
+    def is_weighted(self):
+        """Return a boolean indicating whether edges are weighted."""
+        return self.weighted
+
+    def degree(self, u):
+        """Return the number of open arcs leaving vertex u (closed arcs of a without_edges view do not count)."""
+        weights = self.weights
+        return sum(1 for i in range(self.offsets[u], self.offsets[u + 1]) if weights[i] != float('inf'))
+
+    def neighbors(self, u):
+        """Return an iterator of (v, weight) pairs for the open arcs leaving vertex u."""
+        start, end = self.offsets[u], self.offsets[u + 1]
+        return ((v, weight) for v, weight in zip(self.targets[start:end], self.weights[start:end])
+                if weight != float('inf'))
+
+    def get_adj_list(self, u):
+        """Return an iterator of Edge objects for vertex u, so the CLRS algorithms can run on this graph."""
+        for v, weight in self.neighbors(u):
+            yield Edge(v, weight if self.weighted else None)
+
+    def find_weight(self, u, v):
+        """Return the weight of edge (u, v), or None if (u, v) is not in this graph."""
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[i] == v and self.weights[i] != float('inf'):  # infinite arcs are closed
+                return self.weights[i]
+        return None
+
+    def has_edge(self, u, v):
+        """Return True if edge (u, v) is in this graph, False otherwise."""
+        return self.find_weight(u, v) is not None
+
+    def get_edge_list(self):
+        """Return a Python list containing the edges of this graph."""
+        edge_list = []
+        for u in range(self.card_V):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                v = self.targets[i]
+                if (self.directed or u < v) and self.weights[i] != float('inf'):
+                    edge_list.append((u, v))
+        return edge_list
+
+    def with_unit_weights(self):
+        """
+        Return a graph sharing this graph's structure with every weight set to 1 (number of stops).
+        Every arc gets weight 1, so calling this on a without_edges view reopens the closed arcs:
+        close them after switching to unit weights, as in with_unit_weights().without_edges(...).
+        """
+        weights = array('q', [1]) * len(self.targets)
+        return CSRGraph(self.card_V, self.offsets, self.targets, weights, self.directed, self.weighted)
+
+    def without_edges(self, edges):
+        """
+        Return a view of this graph with some edges closed. The view shares the offsets and
+        targets arrays and takes a cheap copy of the weights (one flat array of doubles, a few
+        microseconds for the tube network), with the closed arcs set to infinity so that no
+        weighted search ever relaxes them. The indices of the closed arcs are kept in closed,
+        for the traversals that ignore weights, such as the BFS engines.
+        Arguments:
+            edges -- iterable of (u, v) pairs; both directions are closed in an undirected graph
+        """
+        weights = array('d', self.weights)
+        closed = set(self.closed)
+        for u, v in edges:
+            for a, b in ((u, v), (v, u)) if not self.directed else ((u, v),):
+                for i in range(self.offsets[a], self.offsets[a + 1]):
+                    if self.targets[i] == b and i not in closed:
+                        weights[i] = float('inf')
+                        closed.add(i)
+        view = CSRGraph(self.card_V, self.offsets, self.targets, weights, self.directed, self.weighted)
+        view.closed = frozenset(closed)
+        closed_count = len(closed) - len(self.closed)
+        view.card_E = self.card_E - (closed_count if self.directed else closed_count // 2)
+        return view
+
+def dijkstra_csr(G, s):
+    """
+    Solve the single-source shortest-paths problem on a CSRGraph.
+    Uses a binary heap with lazy deletion instead of decrease-key, and scans the CSR arrays directly.
+    Arguments:
+        G -- the CSRGraph, with nonnegative weights
+        s -- index of the source vertex
+    Returns:
+        d -- distances from source vertex s (float('inf') if unreachable)
+        pi -- predecessors (None for the source and unreachable vertices)
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    offsets, targets, weights = G.offsets, G.targets, G.weights
+    d = [float('inf')] * G.card_V
+    pi = [None] * G.card_V
+    done = [False] * G.card_V
+    d[s] = 0
+    heap = [(0, s)]
+    stale = 0
+    while heap:
+        du, u = heapq.heappop(heap)
+        if done[u]:  # stale entry left behind by a later improvement
+            stale += 1
+            continue
+        done[u] = True
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            dv = du + weights[i]
+            if dv < d[v]:
+                d[v] = dv
+                pi[v] = u
+                heapq.heappush(heap, (dv, v))
+    if instrumentation.active:
+        # Every decrease-key leaves one stale entry and a full search pops all it pushes,
+        # so the loop only has to count the stale pops.
+        elapsed = time.perf_counter_ns() - start
+        settled = [u for u in range(G.card_V) if done[u]]
+        instrumentation.record("dijkstra", elapsed, settled=len(settled), pushes=len(settled) + stale,
+                               pops=len(settled) + stale, decrease_keys=stale,
+                               relaxations=sum(offsets[u + 1] - offsets[u] for u in settled))
+    return d, pi
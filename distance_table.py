@@ -0,0 +1,240 @@
+import heapq
+import time
+import weakref
+import numpy as np
+from contraction_hierarchy import build_contraction_hierarchy
+from csr_graph import dijkstra_csr
+from journey_stats import UNREACHABLE, choose_dtype
+
+# Smallest batch of origins worth building a hierarchy for: building one costs about as much as a
+# few hundred Dijkstra searches, so smaller batches run Dijkstra unless a hierarchy is already built.
+MIN_ORIGINS_FOR_HIERARCHY = 200
+
+_hierarchies = weakref.WeakKeyDictionary()  # network -> {metric: (graph, hierarchy)}, dropped with the network
+
+
+def _check_metric(metric):
+    if metric not in ("time", "stops"):
+        raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+
+
+def has_hierarchy(network, metric="time"):
+    """Return True if the contraction hierarchy of a network for a metric is already built."""
+    return metric in _hierarchies.get(network, {})
+
+
+def hierarchy_for(network, metric="time"):
+    """
+    Return the station graph and contraction hierarchy of a network for a metric, building them
+    on first use. Call this ahead of time to warm distance_table up for small batches.
+    """
+    _check_metric(metric)
+    built = _hierarchies.setdefault(network, {})
+    if metric not in built:
+        graph = network.graph(metric)
+        built[metric] = (graph, build_contraction_hierarchy(graph))
+    return built[metric]
+
+
+def _indices(network, stations):
+    """
+    Map station names (or indices, which pass through) to vertex indices. Names must match
+    exactly after normalisation: in a batch, a typo must not quietly become another station.
+    Raises ValueError for an unknown name, with the closest names as suggestions, or an index
+    out of range.
+    """
+    index = network.station_index()
+    vertices = []
+    for station in stations:
+        if isinstance(station, str):
+            v = index.find(station)
+            if v is None:
+                suggestions = [index.names[match] for _, match in index.similar(station)[:5]]
+                hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+                raise ValueError(f"Unknown station {station!r}.{hint}")
+        else:
+            v = int(station)
+            if not 0 <= v < network.get_card_V():
+                raise ValueError(f"Station index {v} is out of range.")
+        vertices.append(v)
+    return vertices
+
+
+def _sweep_rows(graph, sources, targets):
+    """
+    Distances from every source to every target with one Dijkstra per distinct source, each
+    stopped as soon as all the targets are settled. On an undirected graph the sweep runs from
+    whichever side of the table has fewer distinct stations, and the result is transposed.
+    Returns:
+        rows -- rows[i][j] = distance from sources[i] to targets[j] (float('inf') if unreachable)
+    """
+    if not graph.is_directed() and 0 < len(set(targets)) < len(set(sources)):
+        return [list(row) for row in zip(*_sweep_rows(graph, targets, sources))]
+    offsets, targets_of, weights = graph.offsets, graph.targets, graph.weights
+    heappop, heappush = heapq.heappop, heapq.heappush
+    wanted = set(targets)
+    found = {}
+    for s in dict.fromkeys(sources):  # distinct sources, in order
+        d = [float('inf')] * graph.card_V
+        done = [False] * graph.card_V
+        d[s] = 0
+        heap = [(0, s)]
+        remaining = len(wanted)
+        while heap:
+            du, u = heappop(heap)
+            if done[u]:  # stale entry
+                continue
+            done[u] = True
+            if u in wanted:
+                remaining -= 1
+                if not remaining:  # every target is settled
+                    break
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets_of[i]
+                dv = du + weights[i]
+                if dv < d[v]:
+                    d[v] = dv
+                    heappush(heap, (dv, v))
+        found[s] = [d[t] for t in targets]
+    return [found[s] for s in sources]
+
+
+def _to_matrix(rows, dtype):
+    """Turn rows of distances (float('inf') if unreachable) into a NumPy matrix."""
+    matrix = np.array(rows, dtype=np.float64).reshape(len(rows), -1)
+    matrix[np.isinf(matrix)] = UNREACHABLE
+    return matrix.astype(dtype)
+
+
+def distance_table(origins, destinations, metric="time", network=None, dtype=None, report=False):
+    """
+    Journey times (or numbers of stops) from every origin to every destination, as one matrix.
+    The work is shared across the batch with a bucket-based many-to-many search over the
+    network's contraction hierarchy, which is built once per network and metric and keeps
+    the search spaces of recently used stations (up to its max_spaces), so repeated tables
+    get cheaper.
+    The hierarchy must be warmed up to pay off: building it costs more than a small table
+    saves, so while none is built, a batch of fewer than MIN_ORIGINS_FOR_HIERARCHY origins
+    (e.g. 50 x 270) is answered by a pruned sweep instead, one Dijkstra per distinct station
+    of the smaller side of the table, stopped once every station of the other side is
+    settled. Call hierarchy_for ahead of time to get the many-to-many search for every batch.
+    Arguments:
+        origins -- station names (matched exactly, after normalisation) or indices
+        destinations -- station names (matched exactly, after normalisation) or indices
+        metric -- "time" (journey time in minutes) or "stops" (number of stops)
+        network -- the Network (default: load_network())
+        dtype -- matrix type (default: as journey_stats.choose_dtype picks for the graph)
+        report -- also time one full Dijkstra per origin and return how the table compares
+    Returns:
+        matrix -- len(origins) x len(destinations) array, matrix[i, j] = distance from origins[i]
+                  to destinations[j], or UNREACHABLE
+        stats -- only if report: {"method": "hierarchy" or "sweep", "build_ms": time spent building
+                 the hierarchy in this call, "ms": total time of the table including the build,
+                 "dijkstra_ms": time of one full Dijkstra per origin, "speedup": dijkstra_ms / ms}
+    Raises ValueError for an unknown metric or station.
+    """
+    _check_metric(metric)
+    if network is None:
+        from network_loader import load_network
+        network = load_network()
+    start = time.perf_counter()
+    sources, targets = _indices(network, origins), _indices(network, destinations)
+    build_time = 0.0
+    if has_hierarchy(network, metric) or len(origins) >= MIN_ORIGINS_FOR_HIERARCHY:
+        method = "hierarchy"
+        if not has_hierarchy(network, metric):
+            build_start = time.perf_counter()
+            hierarchy_for(network, metric)
+            build_time = time.perf_counter() - build_start
+        graph, hierarchy = hierarchy_for(network, metric)
+        rows = hierarchy.many_to_many(sources, targets)
+    else:
+        method = "sweep"
+        graph = network.graph(metric)
+        rows = _sweep_rows(graph, sources, targets)
+    matrix = _to_matrix(rows, dtype or choose_dtype(graph))
+    if not report:
+        return matrix
+    elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    distance_table_dijkstra(sources, targets, metric, network, dtype)
+    reference = time.perf_counter() - start
+    return matrix, {"method": method, "build_ms": build_time * 1000, "ms": elapsed * 1000,
+                    "dijkstra_ms": reference * 1000, "speedup": reference / elapsed if elapsed else float('inf')}
+
+
+def distance_table_dijkstra(origins, destinations, metric="time", network=None, dtype=None):
+    """Reference version of distance_table that runs a full Dijkstra from every origin."""
+    _check_metric(metric)
+    if network is None:
+        from network_loader import load_network
+        network = load_network()
+    graph = _hierarchies[network][metric][0] if has_hierarchy(network, metric) else network.graph(metric)
+    targets = _indices(network, destinations)
+    rows = []
+    for source in _indices(network, origins):
+        d, _ = dijkstra_csr(graph, source)
+        rows.append([d[t] for t in targets])
+    return _to_matrix(rows, dtype or choose_dtype(graph))
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from network_loader import Network, load_network
+    from network_generator import tube_network
+
+    def fresh(network):
+        """A copy of a network with no hierarchy built yet (but its station index, built once per network)."""
+        copy = Network(network.stations, network.lines, network.section_u, network.section_v,
+                       network.section_weight, network.section_line, network.kept)
+        copy.station_index()
+        return copy
+
+    def check(label, network, origins, destinations, metric, reference, method):
+        """Build one table with report=True, check it against reference and print the comparison."""
+        table, stats = distance_table(origins, destinations, metric, network, report=True)
+        if not np.array_equal(table, reference) or stats["method"] != method:
+            raise RuntimeError(f"{label}: wrong table, or {stats['method']} instead of {method}")
+        build = f", including a {stats['build_ms']:.0f} ms hierarchy build" if stats["build_ms"] else ""
+        print(f"    {label:<34}{stats['method']:>10}{stats['ms']:>10.1f} ms{build}; "
+              f"Dijkstra per origin {stats['dijkstra_ms']:.1f} ms; {stats['speedup']:.2f}x")
+
+    def compare(name, network, origins, destinations):
+        """
+        Check distance_table against one Dijkstra per origin and print the comparison it reports:
+        cold small batches (pruned sweep), a cold large batch (hierarchy built for the table),
+        and small batches after a warm-up and repeated on a warm cache.
+        """
+        for metric in ("time", "stops"):
+            print(f"{name} by {metric}:")
+            reference = distance_table_dijkstra(origins, destinations, metric, network)
+            check(f"cold, {len(origins)} x {len(destinations)}", fresh(network), origins, destinations, metric,
+                  reference, "sweep")
+            check(f"cold, {len(origins)} x 20", fresh(network), origins, destinations[:20], metric,
+                  reference[:, :20], "sweep")
+            many = list(range(min(network.get_card_V(), 2 * MIN_ORIGINS_FOR_HIERARCHY)))
+            check(f"cold, {len(many)} x {len(destinations)}", fresh(network), many, destinations, metric,
+                  distance_table_dijkstra(many, destinations, metric, network), "hierarchy")
+            hierarchy_for(network, metric)
+            for label in ("after warm-up", "repeated"):  # the first fills the search-space cache
+                check(f"{label}, {len(origins)} x {len(destinations)}", network, origins, destinations, metric,
+                      reference, "hierarchy")
+
+    random.seed(1828)
+    network = load_network("London Underground Data.xlsx")
+    compare("London Underground", network, random.sample(network.stations, 50), list(network.stations))
+    try:
+        distance_table(["Bank", "Oxfrod Circus"], ["Oval"], network=network)
+        raise RuntimeError("A misspelled station name was accepted")
+    except ValueError as error:
+        print("Misspelled name:", error)
+
+    # A larger tube-like network, wrapped as a Network with one line.
+    n = 5000
+    tails, heads, weights = tube_network(n, seed=1828)
+    synthetic = Network([f"S{v}" for v in range(n)], ["Synthetic"], tails, heads, weights,
+                        [0] * len(tails), range(len(tails)))
+    compare(f"Tube-like network (n = {n})", synthetic, random.sample(range(n), 50), random.sample(range(n), 500))
@@ -0,0 +1,257 @@
+import heapq
+from all_pairs import all_pairs_rows
+from csr_graph import CSRGraph
+
+
+class DynamicShortestPaths:
+    """
+    All-pairs shortest paths of an undirected station graph that are kept up to date as
+    sections close and reopen, instead of rerunning Dijkstra from every station.
+    Closing a section only affects the sources whose shortest-path tree uses it, and within
+    such a tree only the subtree hanging below it; reopening one only affects the stations
+    it brings closer. A closure that cuts off most of the trees (e.g. every redundant section
+    of Task 4(b) at once) reruns the sweep instead, since that is cheaper than the repairs.
+    Each update reports the (source, target) pairs whose distance changed.
+    """
+
+    def __init__(self, card_V, edges, processes=None, rerun_fraction=0.3):
+        """
+        Arguments:
+            card_V -- number of stations
+            edges -- (u, v, weight) for every open section
+            processes -- number of worker processes for the initial sweep and for full reruns,
+                         as for all_pairs_rows
+            rerun_fraction -- rerun the whole sweep instead of repairing the trees when a closure
+                              cuts off more than this fraction of all (source, station) pairs
+        """
+        edges = list(edges)
+        self.card_V = card_V
+        self.processes = processes
+        self.rerun_fraction = rerun_fraction
+        self.adj = [dict() for _ in range(card_V)]
+        for u, v, weight in edges:
+            self.adj[u][v] = weight
+            self.adj[v][u] = weight
+        self.d = [None] * card_V  # d[s] is the distance row of source s
+        self.pi = [None] * card_V  # pi[s] is the predecessor row (shortest-path tree) of source s
+        for source, distances, predecessors in all_pairs_rows(CSRGraph.from_edges(card_V, edges), processes):
+            self.d[source] = distances
+            self.pi[source] = predecessors
+        self.sources_updated = 0  # sources touched by the last update
+        self.reran = False  # whether the last closure reran the whole sweep instead of repairing
+
+    def close_sections(self, sections):
+        """
+        Close sections and repair only the parts of the trees that ran through them.
+        Arguments:
+            sections -- iterable of (u, v) station pairs, in either direction; repeats are ignored
+        Returns:
+            changed -- list of (source, target, old distance, new distance) with source < target
+        """
+        closed = [(u, v) for u, v in sorted({(min(u, v), max(u, v)) for u, v in sections}) if v in self.adj[u]]
+        for u, v in closed:
+            del self.adj[u][v]
+            del self.adj[v][u]
+
+        # Find the cut-off subtrees before repairing any, so the choice between repairing and a
+        # full rerun is made up front: repairing a station costs a few times more than settling
+        # it in a fresh search, so past rerun_fraction of all pairs the rerun is cheaper. Every
+        # sixteenth source is looked at first, and the rest only if that sample stays in budget.
+        budget = self.rerun_fraction * self.card_V * self.card_V
+        sample = range(0, self.card_V, 16)
+        order = list(sample) + [source for source in range(self.card_V) if source % 16]
+        repairs = []
+        total = 0
+        for seen, source in enumerate(order, 1):
+            pi = self.pi[source]
+            # Tree edges among the closed sections; the vertex below each one roots a cut-off subtree.
+            cut = [v if pi[v] == u else u for u, v in closed if pi[v] == u or pi[u] == v]
+            if cut:
+                affected = self._subtree(pi, cut)
+                total += len(affected)
+                repairs.append((source, affected))
+            if total > budget or (seen == len(sample) and total * self.card_V > budget * seen):
+                return self._rerun()
+
+        changed = []
+        self.sources_updated = len(repairs)
+        self.reran = False
+        for source, affected in repairs:
+            old = {x: self.d[source][x] for x in affected}
+            self._repair(source, affected)
+            d = self.d[source]
+            changed.extend((source, x, old[x], d[x]) for x in affected if source < x and d[x] != old[x])
+        return changed
+
+    def _rerun(self):
+        """Rerun the all-pairs sweep on the open sections, as all_pairs_rows does, and return the changed pairs."""
+        changed = []
+        self.sources_updated = self.card_V
+        self.reran = True
+        graph = CSRGraph.from_edges(self.card_V, self.open_sections())
+        for source, distances, predecessors in all_pairs_rows(graph, self.processes):
+            old = self.d[source]
+            if distances != old:
+                changed.extend((source, x, a, b) for x, a, b in zip(range(source + 1, self.card_V),
+                                                                   old[source + 1:], distances[source + 1:]) if a != b)
+            self.d[source], self.pi[source] = distances, predecessors
+        return changed
+
+    def reopen_sections(self, sections):
+        """
+        Reopen sections and propagate only the improvements they bring.
+        A section that is already open with a lower weight is closed first, so that the
+        distances that ran through it are repaired upwards before the new weight is added.
+        Arguments:
+            sections -- iterable of (u, v, weight), in either direction; the last weight given
+                        for a section counts
+        Returns:
+            changed -- list of (source, target, old distance, new distance) with source < target
+        """
+        weights = {(min(u, v), max(u, v)): weight for u, v, weight in sections}
+        sections = [(u, v, weight) for (u, v), weight in weights.items()]
+        slower = [(u, v) for u, v, weight in sections if v in self.adj[u] and self.adj[u][v] < weight]
+        changed = {(s, t): old for s, t, old, _ in self.close_sections(slower)} if slower else {}
+        for u, v, weight in sections:
+            self.adj[u][v] = weight
+            self.adj[v][u] = weight
+
+        self.sources_updated = 0
+        for source in range(self.card_V):
+            d, pi = self.d[source], self.pi[source]
+            heap = []
+            for u, v, weight in sections:
+                for a, b in ((u, v), (v, u)):
+                    if d[a] + weight < d[b]:
+                        changed.setdefault((source, b), d[b])
+                        d[b] = d[a] + weight
+                        pi[b] = a
+                        heapq.heappush(heap, (d[b], b))
+            if not heap:
+                continue
+            self.sources_updated += 1
+            # Dijkstra from the improved stations, continuing only while distances keep dropping.
+            while heap:
+                dx, x = heapq.heappop(heap)
+                if dx > d[x]:
+                    continue
+                for y, weight in self.adj[x].items():
+                    if dx + weight < d[y]:
+                        changed.setdefault((source, y), d[y])
+                        d[y] = dx + weight
+                        pi[y] = x
+                        heapq.heappush(heap, (d[y], y))
+        return [(s, t, old, self.d[s][t]) for (s, t), old in changed.items() if s < t and self.d[s][t] != old]
+
+    def open_sections(self):
+        """Return (u, v, weight) for every open section, with u < v."""
+        return [(u, v, weight) for u in range(self.card_V) for v, weight in self.adj[u].items() if u < v]
+
+    def _subtree(self, pi, roots):
+        """Return the set of vertices in the subtrees of pi rooted at roots."""
+        children = [[] for _ in range(self.card_V)]
+        for x, parent in enumerate(pi):
+            if parent is not None:
+                children[parent].append(x)
+        affected = set(roots)
+        stack = list(roots)
+        while stack:
+            for y in children[stack.pop()]:
+                if y not in affected:
+                    affected.add(y)
+                    stack.append(y)
+        return affected
+
+    def _repair(self, source, affected):
+        """Recompute the distances of the affected vertices; all other distances are still exact."""
+        d, pi, adj = self.d[source], self.pi[source], self.adj
+        heap = []
+        for x in affected:
+            # Best way back in from an unaffected neighbour.
+            d[x], pi[x] = float('inf'), None
+            for y, weight in adj[x].items():
+                if y not in affected and d[y] + weight < d[x]:
+                    d[x], pi[x] = d[y] + weight, y
+            if d[x] != float('inf'):
+                heapq.heappush(heap, (d[x], x))
+        while heap:
+            dx, x = heapq.heappop(heap)
+            if dx > d[x]:
+                continue
+            for y, weight in adj[x].items():
+                if y in affected and dx + weight < d[y]:
+                    d[y], pi[y] = dx + weight, x
+                    heapq.heappush(heap, (d[y], y))
+
+    def distance(self, source, target):
+        """Return the current shortest-path distance from source to target."""
+        return self.d[source][target]
+
+
+# Testing
+if __name__ == "__main__":
+
+    import time
+    from adjacency_list_graph import AdjacencyListGraph
+    from mst import kruskal
+    from network_loader import load_network
+
+    network = load_network("London Underground Data.xlsx")
+    edges = network.edges()
+    n = network.get_card_V()
+    dynamic = DynamicShortestPaths(n, edges, processes=1)
+
+    # The redundant sections closed in Task 4(b): everything off the minimum spanning tree.
+    graph = AdjacencyListGraph(n, directed=False, weighted=True)
+    for u, v, weight in edges:
+        graph.insert_edge(u, v, weight)
+    redundant = set(graph.get_edge_list()) - set(kruskal(graph).get_edge_list())
+    weight_of = {(u, v): weight for u, v, weight in edges}
+    weight_of.update({(v, u): weight for u, v, weight in edges})
+
+    def full_rerun(open_edges, before=None):
+        """Rerun the sweep and list the pairs changed since before, which is what an update has to beat."""
+        start = time.perf_counter()
+        rows = [row[1] for row in all_pairs_rows(CSRGraph.from_edges(n, open_edges), processes=1)]
+        changed = [(s, t) for s in range(n) for t in range(s + 1, n) if rows[s][t] != before[s][t]] if before else []
+        return rows, time.perf_counter() - start, changed
+
+    # Single closures, then the whole redundant set at once. Each is timed as the best of three
+    # close/reopen rounds against the best of three full reruns, which must also list the changes.
+    scenarios = [[section] for section in sorted(redundant)[:5]] + [sorted(redundant)]
+    for closure in scenarios:
+        open_edges = [(u, v, w) for u, v, w in edges if (u, v) not in closure and (v, u) not in closure]
+        update_time = rerun_time = float('inf')
+        for _ in range(3):
+            before = [row[:] for row in dynamic.d]
+            start = time.perf_counter()
+            changed = dynamic.close_sections(closure)
+            update_time = min(update_time, time.perf_counter() - start)
+            sources = dynamic.sources_updated
+            rows, seconds, rerun_changed = full_rerun(open_edges, before)
+            rerun_time = min(rerun_time, seconds)
+            if dynamic.d != rows or sorted((s, t) for s, t, _, _ in changed) != rerun_changed:
+                raise RuntimeError("Incremental update does not match a full rerun")
+            dynamic.reopen_sections([(u, v, weight_of[(u, v)]) for u, v in closure])
+            if dynamic.d != full_rerun(edges)[0]:
+                raise RuntimeError("Reopening does not restore the original distances")
+        print(f"Closed {len(closure):>2} section(s): {len(changed):>5} pairs changed, "
+              f"{'full rerun' if dynamic.reran else f'{sources:>3} sources repaired'}, "
+              f"{update_time * 1000:7.1f} ms vs full rerun {rerun_time * 1000:7.1f} ms")
+        # Choosing the rerun only costs a sample of the subtrees, so the update is never slower
+        # than a rerun beyond the noise of the timings.
+        if update_time > rerun_time * 1.2:
+            raise RuntimeError(f"Closing {len(closure)} section(s) took longer than a full rerun")
+
+    # Repeated and reversed pairs in one closure, then a section reopened with a higher weight.
+    u, v = sorted(redundant)[0]
+    dynamic.close_sections([(u, v), (v, u), (u, v)])
+    if dynamic.d != full_rerun([edge for edge in edges if edge[:2] != (u, v) and edge[:2] != (v, u)])[0]:
+        raise RuntimeError("Closing a repeated section does not match a full rerun")
+    dynamic.reopen_sections([(v, u, weight_of[(u, v)])])
+    u, v, weight = edges[0]  # a section on many shortest paths
+    slower = [(a, b, w + 10 if (a, b) == (u, v) else w) for a, b, w in edges]
+    changed = dynamic.reopen_sections([(u, v, weight + 10)])
+    if not changed or dynamic.d != full_rerun(slower)[0]:
+        raise RuntimeError("Raising the weight of an open section leaves stale distances")
+    print(f"Repeated closures and a slower reopened section match a full rerun ({len(changed)} pairs changed)")
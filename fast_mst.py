@@ -0,0 +1,177 @@
+import time
+from array import array
+import instrumentation
+from csr_graph import CSRGraph
+
+
+def edge_arrays(G):
+    """
+    Return the edges of an undirected graph as parallel arrays (tails, heads, weights).
+    Edges are listed once each, by tail vertex and then in adjacency-list order, which is the
+    order the CLRS kruskal collects them in. Works on a CSRGraph or an AdjacencyListGraph.
+    """
+    if G.is_directed():
+        raise RuntimeError("Graph should be undirected.")
+    tails, heads, weights = array('i'), array('i'), array('d')
+    if isinstance(G, CSRGraph):
+        offsets, targets, costs = G.offsets, G.targets, G.weights
+        for u in range(G.get_card_V()):
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if u < v and costs[i] != float('inf'):  # skip arcs closed in a without_edges view
+                    tails.append(u)
+                    heads.append(v)
+                    weights.append(costs[i])
+    else:
+        for u in range(G.get_card_V()):
+            for edge in G.get_adj_list(u):
+                if u < edge.get_v():
+                    tails.append(u)
+                    heads.append(edge.get_v())
+                    weights.append(edge.get_weight())
+    return tails, heads, weights
+
+
+def kruskal_mask(card_V, tails, heads, weights):
+    """
+    Kruskal's algorithm over edge arrays with an array-based disjoint-set forest.
+    The edge order is sorted by weight once (a stable sort, so ties are broken exactly as in
+    the CLRS version), and the forest uses union by rank with path halving.
+    Arguments:
+        card_V -- number of vertices
+        tails, heads, weights -- parallel edge arrays, e.g. from edge_arrays
+    Returns:
+        in_mst -- bytearray with in_mst[i] = 1 if edge i is in the minimum spanning forest
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    parent = array('i', range(card_V))
+    rank = bytearray(card_V)
+    in_mst = bytearray(len(tails))
+    remaining = card_V - 1  # a spanning tree of a connected graph has card_V - 1 edges
+    rejected = 0
+    for i in sorted(range(len(tails)), key=weights.__getitem__):
+        # Find both roots, halving the paths on the way.
+        x = tails[i]
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        y = heads[i]
+        while parent[y] != y:
+            parent[y] = parent[parent[y]]
+            y = parent[y]
+        if x == y:
+            rejected += 1
+            continue  # both endpoints are already in the same tree
+        if rank[x] < rank[y]:
+            x, y = y, x
+        parent[y] = x
+        if rank[x] == rank[y]:
+            rank[x] += 1
+        in_mst[i] = 1
+        remaining -= 1
+        if remaining == 0:
+            break
+    if instrumentation.active:
+        unions = card_V - 1 - remaining
+        instrumentation.record("kruskal", time.perf_counter_ns() - start, edges=len(tails),
+                               examined=unions + rejected, unions=unions, rejected=rejected)
+    return in_mst
+
+
+def prim_mask(G):
+    """
+    Prim's algorithm with a key array instead of a priority queue: O(V^2 + E), which beats a
+    heap on dense graphs such as the synthetic edge_probability=0.1 networks. Disconnected
+    graphs get a minimum spanning forest, one tree per component.
+    Arguments:
+        G -- the network as an undirected CSRGraph
+    Returns:
+        tails, heads, weights -- the edge arrays of G, as from edge_arrays
+        in_mst -- bytearray with in_mst[i] = 1 if edge i is in the minimum spanning forest
+    """
+    card_V = G.get_card_V()
+    inf = float('inf')
+    key = [inf] * card_V  # lightest known edge from the tree to each vertex; inf once in the tree
+    parent = [-1] * card_V  # tree end of that edge
+    visited = bytearray(card_V)
+    offsets, targets, costs = G.offsets, G.targets, G.weights
+    for _ in range(card_V):
+        best = min(key)  # a C-level scan of the key array
+        if best == inf:  # nothing left in this component: start a tree in the next one
+            u = visited.find(0)
+            parent[u] = -1
+        else:
+            u = key.index(best)
+        visited[u] = 1
+        key[u] = inf
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            if not visited[v] and costs[i] < key[v]:
+                key[v] = costs[i]
+                parent[v] = u
+
+    # Report the tree against the edge arrays.
+    tree = set()
+    for v in range(card_V):
+        if parent[v] >= 0:
+            tree.add((parent[v], v) if parent[v] < v else (v, parent[v]))
+    tails, heads, weights = edge_arrays(G)
+    in_mst = bytearray((tails[i], heads[i]) in tree for i in range(len(tails)))
+    return tails, heads, weights, in_mst
+
+
+def redundant_edges(G, algorithm="kruskal"):
+    """
+    Return the edges of G that are not in its minimum spanning forest, as (u, v) pairs with u < v.
+    Arguments:
+        G -- an undirected CSRGraph or AdjacencyListGraph
+        algorithm -- "kruskal" (any graph) or "prim" (dense CSRGraphs)
+    """
+    if algorithm == "prim":
+        tails, heads, _, in_mst = prim_mask(G)
+    else:
+        tails, heads, weights = edge_arrays(G)
+        in_mst = kruskal_mask(G.get_card_V(), tails, heads, weights)
+    return [(tails[i], heads[i]) for i in range(len(tails)) if not in_mst[i]]
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from adjacency_list_graph import AdjacencyListGraph
+    from mst import kruskal, get_total_weight
+
+    random.seed(1828)
+    for n in (200, 1000, 2000):
+        edge_list = [(u, v, random.randint(1, 15)) for u in range(n) for v in range(u + 1, n) if random.random() < 0.1]
+        csr = CSRGraph.from_edges(n, edge_list)
+        timings = {}
+
+        start = time.perf_counter()
+        tails, heads, weights = edge_arrays(csr)
+        in_kruskal = kruskal_mask(n, tails, heads, weights)
+        timings["array Kruskal"] = time.perf_counter() - start
+        start = time.perf_counter()
+        _, _, _, in_prim = prim_mask(csr)
+        timings["array Prim"] = time.perf_counter() - start
+        kruskal_weight = sum(weights[i] for i in range(len(weights)) if in_kruskal[i])
+        prim_weight = sum(weights[i] for i in range(len(weights)) if in_prim[i])
+
+        if n <= 1000:  # the CLRS version needs a linked-list graph and is much slower
+            graph = AdjacencyListGraph(n, directed=False, weighted=True)
+            for u, v, weight in edge_list:
+                graph.insert_edge(u, v, weight)
+            start = time.perf_counter()
+            clrs_tree = kruskal(graph)
+            timings["CLRS kruskal"] = time.perf_counter() - start
+            if set(clrs_tree.get_edge_list()) != {(tails[i], heads[i]) for i in range(len(tails)) if in_kruskal[i]}:
+                raise RuntimeError("Array Kruskal picked a different tree from CLRS kruskal")
+            if get_total_weight(clrs_tree) != prim_weight:
+                raise RuntimeError("Prim's tree is not minimal")
+        elif kruskal_weight != prim_weight:
+            raise RuntimeError("Kruskal and Prim disagree on the minimum weight")
+
+        print(f"n = {n}, {len(edge_list)} edges, MST weight {kruskal_weight:.0f}: "
+              + ", ".join(f"{label} {seconds * 1000:.1f} ms" for label, seconds in timings.items()))
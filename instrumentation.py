@@ -0,0 +1,334 @@
+import json
+import time
+from contextlib import contextmanager
+
+active = False  # read once per call by the instrumented engines; nothing is recorded while False
+_tracer = None
+
+
+class Tracer:
+    """
+    Collects the counters and timings reported by the routing engines while tracing is on.
+    Work is grouped into phases, named scopes opened with phase(); inside a phase every engine
+    adds its call count, elapsed time and counters to a bucket named after it (e.g. "dijkstra",
+    "build", "path"). When a phase ends it becomes one JSON record, written as a line of the
+    trace file if there is one. Work outside any phase goes to a phase named "run".
+    """
+
+    def __init__(self, file_path=None):
+        """
+        Arguments:
+            file_path -- JSON-lines file to append the records to (default: keep them in memory only)
+        """
+        self.file = open(file_path, "a") if file_path else None
+        self.records = []
+        self.scopes = [self._scope("run", {})]
+
+    @staticmethod
+    def _scope(name, labels):
+        return {"phase": name, "labels": labels, "start": time.perf_counter_ns(), "buckets": {}}
+
+    def add(self, bucket, elapsed_ns, counters):
+        """Add one call of an engine to its bucket in the innermost phase."""
+        totals = self.scopes[-1]["buckets"].setdefault(bucket, {"calls": 0, "ns": 0})
+        totals["calls"] += 1
+        totals["ns"] += elapsed_ns
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+
+    def open(self, name, labels):
+        """Start a phase nested in the current one."""
+        self.scopes.append(self._scope(name, labels))
+
+    def close(self):
+        """End the innermost phase and emit its record."""
+        scope = self.scopes.pop()
+        record = {"phase": scope["phase"], **scope["labels"],
+                  "ms": (time.perf_counter_ns() - scope["start"]) / 1e6, "buckets": {}}
+        for bucket, totals in scope["buckets"].items():
+            record["buckets"][bucket] = {"calls": totals["calls"], "ms": totals["ns"] / 1e6,
+                                         **{k: v for k, v in totals.items() if k not in ("calls", "ns")}}
+        if scope["phase"] != "run" or record["buckets"]:  # an empty root phase is not worth a line
+            self.records.append(record)
+            if self.file is not None:
+                self.file.write(json.dumps(record) + "\n")
+        return record
+
+    def flush(self):
+        """Write the buffered lines of the trace file out, e.g. before forking worker processes."""
+        if self.file is not None:
+            self.file.flush()
+
+    def finish(self):
+        """Close every open phase, including the root one, and the trace file."""
+        while self.scopes:
+            self.close()
+        if self.file is not None:
+            self.file.close()
+        return self.records
+
+
+def enable(file_path=None):
+    """
+    Turn tracing on. Engines called from now on report their counters and timings.
+    Arguments:
+        file_path -- JSON-lines file to append the trace to (default: keep it in memory only)
+    Returns:
+        tracer -- the Tracer collecting the records
+    """
+    global active, _tracer
+    if _tracer is not None:
+        disable()
+    _tracer = Tracer(file_path)
+    active = True
+    return _tracer
+
+
+def disable():
+    """Turn tracing off and return every record collected since enable."""
+    global active, _tracer
+    active = False
+    tracer, _tracer = _tracer, None
+    return tracer.finish() if tracer is not None else []
+
+
+def flush():
+    """Flush the trace file, so forked processes do not inherit (and later write) buffered lines."""
+    if _tracer is not None:
+        _tracer.flush()
+
+
+def start_worker():
+    """
+    Start tracing in a worker process. A forked worker inherits its parent's tracer, which must
+    be dropped without finishing it: finishing would write the parent's records to its file
+    again. The worker's tracer keeps its records in memory, for collect.
+    """
+    global _tracer
+    _tracer = None
+    enable()
+
+
+def collect():
+    """
+    Take the bucket totals recorded in the innermost phase so far and reset them, so a worker
+    process can send them back to the process that started it (see absorb).
+    """
+    if _tracer is None:
+        return {}
+    buckets = _tracer.scopes[-1]["buckets"]
+    _tracer.scopes[-1]["buckets"] = {}
+    return buckets
+
+
+def absorb(buckets):
+    """Add bucket totals from collect, e.g. made in a worker process, to the innermost phase."""
+    if _tracer is None:
+        return
+    for bucket, totals in buckets.items():
+        target = _tracer.scopes[-1]["buckets"].setdefault(bucket, {"calls": 0, "ns": 0})
+        for name, value in totals.items():
+            target[name] = target.get(name, 0) + value
+
+
+def record(bucket, elapsed_ns, **counters):
+    """
+    Report one call of an engine. Engines check active before calling this, and take the
+    time before working out their counters, so the counting is not part of the timing.
+    Arguments:
+        bucket -- name of the engine or step, e.g. "dijkstra" or "path"
+        elapsed_ns -- time the call took, from time.perf_counter_ns()
+        counters -- numbers to add to the bucket's totals, e.g. pushes=12
+    """
+    if _tracer is not None:
+        _tracer.add(bucket, elapsed_ns, counters)
+
+
+@contextmanager
+def phase(name, **labels):
+    """
+    Group the engine calls made inside a with block into one record of the trace.
+    Does nothing while tracing is off.
+    Arguments:
+        name -- name of the phase, e.g. "load" or "all-pairs"
+        labels -- extra JSON-ready fields for the record, e.g. graph="london-underground"
+    """
+    if not active:
+        yield
+        return
+    tracer = _tracer
+    tracer.open(name, labels)
+    try:
+        yield
+    finally:
+        if tracer is _tracer:  # tracing was not restarted inside the block
+            tracer.close()
+
+
+def traced(func, name, file_path=None, **labels):
+    """
+    Run func once with tracing on, inside one phase, and return the records it produced.
+    Tracing must be off when this is called; it is off again afterwards.
+    Arguments:
+        func -- function of no arguments to run
+        name, labels -- name and fields of the phase, as for phase
+        file_path -- JSON-lines file to append the records to (default: none)
+    """
+    enable(file_path)
+    try:
+        with phase(name, **labels):
+            func()
+    finally:
+        records = disable()
+    return records
+
+
+def read_trace(file_path):
+    """Read the records of a JSON-lines trace file."""
+    with open(file_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarise(records, by=("phase",)):
+    """
+    Add up the buckets of trace records that share the same values of the fields in by.
+    Arguments:
+        records -- records from disable, traced or read_trace
+        by -- fields of a record to group on, e.g. ("phase", "graph")
+    Returns:
+        summary -- dictionary from each group (a tuple of field values) to {"ms": wall time,
+                   "records": count, "buckets": {bucket: totals}}
+    """
+    summary = {}
+    for r in records:
+        group = summary.setdefault(tuple(r.get(field) for field in by), {"ms": 0.0, "records": 0, "buckets": {}})
+        group["ms"] += r["ms"]
+        group["records"] += 1
+        for bucket, totals in r["buckets"].items():
+            target = group["buckets"].setdefault(bucket, {})
+            for name, value in totals.items():
+                target[name] = target.get(name, 0) + value
+    return summary
+
+
+def print_summary(summary):
+    """Print a summary from summarise as one table row per bucket."""
+    for group, totals in summary.items():
+        print(f"{' / '.join(str(value) for value in group)}: {totals['ms']:.2f} ms over {totals['records']} record(s)")
+        for bucket, counters in totals["buckets"].items():
+            extra = ", ".join(f"{name}={value}" for name, value in counters.items() if name not in ("calls", "ms"))
+            print(f"    {bucket:<16}{counters['calls']:>8} call(s){counters['ms']:>11.3f} ms  {extra}")
+
+
+# Testing
+if __name__ == "__main__":
+
+    import heapq
+    import random
+    import instrumentation  # the engines see this module, not __main__
+    from all_pairs import analyse_all_pairs
+    from benchmark import measure
+    from csr_graph import dijkstra_csr
+    from fast_mst import edge_arrays, kruskal_mask
+    from network_loader import load_network
+    from point_to_point import shortest_route
+    from stop_count import bfs_csr
+
+    def counting_dijkstra(G, s):
+        """Dijkstra with every heap operation counted as it happens, to check the derived counters."""
+        counts = {"settled": 0, "pushes": 1, "pops": 0, "decrease_keys": 0, "relaxations": 0}
+        d = [float('inf')] * G.card_V
+        done = [False] * G.card_V
+        d[s] = 0
+        heap = [(0, s)]
+        while heap:
+            du, u = heapq.heappop(heap)
+            counts["pops"] += 1
+            if done[u]:
+                continue
+            done[u] = True
+            counts["settled"] += 1
+            for i in range(G.offsets[u], G.offsets[u + 1]):
+                counts["relaxations"] += 1
+                v = G.targets[i]
+                if du + G.weights[i] < d[v]:
+                    counts["decrease_keys"] += d[v] != float('inf')
+                    d[v] = du + G.weights[i]
+                    counts["pushes"] += 1
+                    heapq.heappush(heap, (d[v], v))
+        return counts
+
+    def plain_dijkstra(G, s):
+        """dijkstra_csr as it was before instrumentation, to measure what the disabled hooks cost."""
+        offsets, targets, weights = G.offsets, G.targets, G.weights
+        d = [float('inf')] * G.card_V
+        pi = [None] * G.card_V
+        done = [False] * G.card_V
+        d[s] = 0
+        heap = [(0, s)]
+        while heap:
+            du, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                dv = du + weights[i]
+                if dv < d[v]:
+                    d[v] = dv
+                    pi[v] = u
+                    heapq.heappush(heap, (dv, v))
+        return d, pi
+
+    network = load_network("London Underground Data.xlsx")
+    graph = network.graph("time")
+    for source in range(graph.get_card_V()):
+        records = instrumentation.traced(lambda: dijkstra_csr(graph, source), "check")
+        counters = {k: v for k, v in records[0]["buckets"]["dijkstra"].items() if k not in ("calls", "ms")}
+        if counters != counting_dijkstra(graph, source):
+            raise RuntimeError(f"Derived Dijkstra counters are wrong for source {source}")
+    print("Derived Dijkstra counters match explicit counting from every source")
+
+    # What the hooks cost: the best median of interleaved rounds, so drift in the machine hits every variant.
+    best = {"uninstrumented": float('inf'), "tracing off": float('inf'), "tracing on": float('inf')}
+    for _ in range(5):
+        for label, func in (("uninstrumented", lambda: plain_dijkstra(graph, 0)),
+                            ("tracing off", lambda: dijkstra_csr(graph, 0)),
+                            ("tracing on", lambda: dijkstra_csr(graph, 0))):
+            if label == "tracing on":
+                instrumentation.enable()
+            best[label] = min(best[label], measure(func, repeat=9)["median_ms"])
+            instrumentation.disable()
+    print("Full Dijkstra on the real network: " + ", ".join(f"{label} {ms * 1000:.1f} us" for label, ms in best.items()))
+
+    # One traced run of every engine on the real network.
+    random.seed(1828)
+    pairs = [(random.randrange(graph.get_card_V()), random.randrange(graph.get_card_V())) for _ in range(100)]
+    instrumentation.enable()
+    with instrumentation.phase("load", graph="london-underground"):
+        network = load_network("London Underground Data.xlsx")
+    with instrumentation.phase("build", graph="london-underground"):
+        graph = network.graph("time")
+    with instrumentation.phase("search", graph="london-underground"):
+        for s, t in pairs:
+            shortest_route(graph, s, t)
+        bfs_csr(graph, 0)
+        kruskal_mask(graph.get_card_V(), *edge_arrays(graph))
+    with instrumentation.phase("all-pairs", graph="london-underground"):
+        analyse_all_pairs(graph, processes=2)
+    instrumentation.print_summary(instrumentation.summarise(instrumentation.disable(), by=("graph", "phase")))
+
+    # A file trace around a pooled sweep: forked workers must not write to the file themselves.
+    import os
+    import tempfile
+    trace_path = os.path.join(tempfile.mkdtemp(), "trace.jsonl")
+    instrumentation.enable(trace_path)
+    with instrumentation.phase("warm"):
+        dijkstra_csr(graph, 0)
+    with instrumentation.phase("sweep"):
+        analyse_all_pairs(graph, processes=4)
+    instrumentation.disable()
+    records = instrumentation.read_trace(trace_path)
+    if [r["phase"] for r in records] != ["warm", "sweep"] or records[1]["buckets"]["dijkstra"]["calls"] != graph.get_card_V():
+        raise RuntimeError(f"Pooled sweep wrote {len(records)} trace lines instead of 2: {[r['phase'] for r in records]}")
+    print("A pooled sweep under a file trace writes one line per phase, with the workers' counters")
@@ -0,0 +1,126 @@
+import numpy as np
+from all_pairs import all_pairs_rows
+
+UNREACHABLE = -1  # sentinel stored in the distance matrix for pairs with no route
+
+
+def choose_dtype(graph):
+    """
+    Pick the smallest matrix type that holds every shortest-path distance exactly.
+    A shortest path never repeats an edge, so the total edge weight bounds every distance.
+    """
+    weights = np.asarray(graph.weights, dtype=np.float64)
+    whole = bool(np.all(weights == np.round(weights)))
+    if whole and weights.sum() / (1 if graph.is_directed() else 2) < np.iinfo(np.int16).max:
+        return np.int16
+    return np.float32
+
+
+def distance_matrix(graph, processes=None, dtype=None):
+    """
+    Materialise all shortest-path distances as a compact NumPy matrix.
+    Arguments:
+        graph -- the network as a CSRGraph
+        processes -- number of worker processes for the sweep, as for all_pairs_rows
+        dtype -- matrix type (default: int16 when every distance fits, otherwise float32)
+    Returns:
+        matrix -- n x n array, matrix[s, t] = distance from s to t, or UNREACHABLE
+    """
+    n = graph.get_card_V()
+    if dtype is None:
+        dtype = choose_dtype(graph)
+    matrix = np.empty((n, n), dtype=dtype)
+    for source, distances, _ in all_pairs_rows(graph, processes):
+        row = np.asarray(distances, dtype=np.float64)
+        row[np.isinf(row)] = UNREACHABLE
+        matrix[source] = row
+    return matrix
+
+
+def pair_durations(matrix):
+    """Return the distances of all connected unique pairs (s < t) as a flat array."""
+    upper = matrix[np.triu_indices(matrix.shape[0], k=1)]
+    return upper[upper != UNREACHABLE]
+
+
+def eccentricities(matrix):
+    """Return the eccentricity of every vertex, measured within its own connected component."""
+    reachable = np.where(matrix == UNREACHABLE, 0, matrix)
+    return reachable.max(axis=1)
+
+
+def journey_statistics(matrix, percentiles=(25, 50, 75, 90, 99)):
+    """
+    Summarise a distance matrix with vectorised operations.
+    Arguments:
+        matrix -- matrix returned by distance_matrix
+        percentiles -- percentiles of the pair durations to report
+    Returns:
+        stats -- dictionary with the pair count, mean, max, percentiles, diameter and radius
+    """
+    durations = pair_durations(matrix).astype(np.float64)
+    eccentricity = eccentricities(matrix)
+    connected = (matrix != UNREACHABLE).sum(axis=1) > 1  # vertices with at least one other reachable vertex
+    return {
+        "pairs": int(durations.size),
+        "unreachable pairs": int(matrix.shape[0] * (matrix.shape[0] - 1) // 2 - durations.size),
+        "mean": float(durations.mean()) if durations.size else float('nan'),
+        "max": float(durations.max()) if durations.size else float('nan'),
+        "percentiles": dict(zip(percentiles, np.percentile(durations, percentiles).tolist()))
+        if durations.size else {},
+        "diameter": float(eccentricity.max()) if connected.any() else 0.0,
+        "radius": float(eccentricity[connected].min()) if connected.any() else 0.0,
+    }
+
+
+def journey_histogram(matrix, bins=20):
+    """Return (counts, bin_edges) of the connected unique-pair durations, as numpy.histogram does."""
+    return np.histogram(pair_durations(matrix), bins=bins)
+
+
+def compare_statistics(before, after, labels=("Original", "Reduced")):
+    """Print two journey_statistics dictionaries side by side with the change between them."""
+    print(f"{'':>20}{labels[0]:>12}{labels[1]:>12}{'Change':>12}")
+    for key in ("pairs", "unreachable pairs", "mean", "max", "diameter", "radius"):
+        print(f"{key:>20}{before[key]:>12.2f}{after[key]:>12.2f}{after[key] - before[key]:>+12.2f}")
+    for q in before["percentiles"]:
+        a, b = before["percentiles"][q], after["percentiles"].get(q, float('nan'))
+        print(f"{f'p{q}':>20}{a:>12.2f}{b:>12.2f}{b - a:>+12.2f}")
+
+
+def save_matrix(file_path, matrix, stations):
+    """Export a distance matrix and its station names to a compressed .npz file."""
+    np.savez_compressed(file_path, distances=matrix, stations=np.asarray(stations, dtype=str),
+                        unreachable=UNREACHABLE)
+
+
+def load_matrix(file_path):
+    """Load (matrix, stations) written by save_matrix."""
+    with np.load(file_path) as data:
+        return data["distances"], data["stations"].tolist()
+
+
+# Testing
+if __name__ == "__main__":
+
+    from adjacency_list_graph import AdjacencyListGraph
+    from csr_graph import CSRGraph
+    from mst import kruskal
+    from network_loader import load_network
+
+    # Step 1: Load the network
+    network = load_network("London Underground Data.xlsx")
+    stations = network.stations
+    graph = AdjacencyListGraph(len(stations), directed=False, weighted=True)
+    for u, v, weight in network.edges():
+        graph.insert_edge(u, v, weight)
+
+    # Step 2: Distance matrices for the original network and the network without its redundant sections
+    original = distance_matrix(CSRGraph.from_adjacency_list_graph(graph))
+    reduced = distance_matrix(CSRGraph.from_adjacency_list_graph(kruskal(graph)))
+    print(f"Distance matrix: {original.shape}, {original.dtype}, {original.nbytes / 1024:.0f} KiB")
+
+    # Step 3: Compare the two networks and export the matrices
+    compare_statistics(journey_statistics(original), journey_statistics(reduced))
+    save_matrix("journey_times_original.npz", original, stations)
+    save_matrix("journey_times_reduced.npz", reduced, stations)
@@ -0,0 +1,185 @@
+import heapq
+from array import array
+from csr_graph import CSRGraph
+from point_to_point import build_path
+
+
+class LineGraph:
+    """
+    Line-aware version of the station graph. Every (station, line) pair served by the network
+    is a node, each section of the workbook joins the two nodes of its line, and the nodes of
+    one station are joined by transfer edges that carry the interchange penalty. Sections that
+    the station graph collapses (the same station pair on several lines) stay separate, so a
+    route knows which line each leg uses and pays for every change of line.
+    """
+
+    def __init__(self, network, interchange_penalty=5, metric="time"):
+        """
+        Arguments:
+            network -- the Network from network_loader.load_network
+            interchange_penalty -- cost of changing lines at a station, in minutes or stops
+            metric -- "time" (section durations) or "stops" (one per section)
+        """
+        if metric not in ("time", "stops"):
+            raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+        self.network = network
+        self.interchange_penalty = interchange_penalty
+        self.metric = metric
+        self.node_station = array('i')  # station of every node
+        self.node_line = array('i')  # line of every node
+        self.station_nodes = [[] for _ in range(network.get_card_V())]  # nodes of every station
+        node_of = {}
+
+        def node(station, line):
+            if (station, line) not in node_of:
+                node_of[(station, line)] = len(self.node_station)
+                self.node_station.append(station)
+                self.node_line.append(line)
+                self.station_nodes[station].append(node_of[(station, line)])
+            return node_of[(station, line)]
+
+        # One ride edge per (node, node) pair, keeping the fastest if the workbook repeats a section.
+        rides = {}
+        for i in range(len(network.section_u)):
+            a = node(network.section_u[i], network.section_line[i])
+            b = node(network.section_v[i], network.section_line[i])
+            cost = network.section_weight[i] if metric == "time" else 1
+            key = (min(a, b), max(a, b))
+            if a != b and (key not in rides or cost < rides[key]):
+                rides[key] = cost
+
+        tails, heads, costs = array('i'), array('i'), []
+        for (a, b), cost in rides.items():
+            tails.append(a)
+            heads.append(b)
+            costs.append(cost)
+        for nodes in self.station_nodes:
+            for i in range(len(nodes)):
+                for j in range(i + 1, len(nodes)):
+                    tails.append(nodes[i])
+                    heads.append(nodes[j])
+                    costs.append(interchange_penalty)
+        self.transfer_count = len(tails) - len(rides)
+        self.graph = CSRGraph.from_arrays(len(self.node_station), tails, heads, costs, directed=False, weighted=True)
+
+    def get_card_V(self):
+        """Return the number of (station, line) nodes."""
+        return len(self.node_station)
+
+    def route(self, source, target):
+        """
+        Find the cheapest route between two stations, counting interchange penalties.
+        The search starts on every line of the source station at once and stops as soon as
+        any line of the target station is settled.
+        Arguments:
+            source -- index of the source station
+            target -- index of the destination station
+        Returns:
+            cost -- journey cost including the penalties (float('inf') if unreachable)
+            legs -- list of (line index, station indices) for every leg ridden, in order
+        """
+        if source == target:
+            return 0, []
+        offsets, targets, weights = self.graph.offsets, self.graph.targets, self.graph.weights
+        goal = set(self.station_nodes[target])
+        d = [float('inf')] * len(self.node_station)  # flat lists: the graph is small enough to reset per query
+        pi = [None] * len(self.node_station)
+        done = bytearray(len(self.node_station))
+        heap = []
+        for s in self.station_nodes[source]:
+            d[s] = 0
+            heap.append((0, s))
+        reached = None
+        while heap:
+            du, u = heapq.heappop(heap)
+            if done[u]:  # stale entry
+                continue
+            if u in goal:  # early exit: the cheapest line of the target is settled
+                reached = u
+                break
+            done[u] = 1
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                dv = du + weights[i]
+                if dv < d[v]:
+                    d[v] = dv
+                    pi[v] = u
+                    heapq.heappush(heap, (dv, v))
+        if reached is None:
+            return float('inf'), []
+        return d[reached], self.legs(build_path(pi, reached))
+
+    def legs(self, nodes):
+        """Split a node path into legs, one per line ridden; transfer edges end a leg."""
+        legs = []
+        for u in nodes:
+            station, line = self.node_station[u], self.node_line[u]
+            if legs and legs[-1][0] == line:
+                legs[-1][1].append(station)
+            elif legs and legs[-1][1][-1] == station:  # changed lines here
+                if len(legs[-1][1]) == 1:
+                    legs.pop()  # boarded and left the line at the same station: not a leg
+                legs.append((line, [station]))
+            else:
+                legs.append((line, [station]))
+        if legs and len(legs[-1][1]) == 1:
+            legs.pop()  # changed onto a line at the target itself
+        return legs
+
+    def describe(self, legs):
+        """Return the legs as readable lines: line name, first and last station, number of stops."""
+        stations, lines = self.network.stations, self.network.lines
+        return [f"{lines[line]}: {stations[path[0]]} -> {stations[path[-1]]} ({len(path) - 1} stops)"
+                for line, path in legs]
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import sys
+    import time
+    from csr_graph import dijkstra_csr
+    from point_to_point import shortest_route
+    from network_loader import load_network
+
+    network = load_network("London Underground Data.xlsx")
+    station_graph = network.graph("time")
+    n = network.get_card_V()
+
+    # Without a penalty the line graph can only be as fast as the station graph or faster
+    # (where the workbook lists the same pair on several lines with different times).
+    free = LineGraph(network, interchange_penalty=0)
+    print(f"{n} stations -> {free.get_card_V()} (station, line) nodes, {free.transfer_count} transfer edges")
+    for source in range(n):
+        reference, _ = dijkstra_csr(station_graph, source)
+        for target in range(0, n, 7):
+            cost, legs = free.route(source, target)
+            if cost > reference[target] or (legs and (legs[0][1][0] != source or legs[-1][1][-1] != target)):
+                raise RuntimeError(f"Line graph disagrees with the station graph for {source} -> {target}")
+    print("Penalty-free line routes agree with the station graph")
+
+    penalised = LineGraph(network, interchange_penalty=5)
+    if len(sys.argv) == 3:
+        source, target = network.station_to_index[sys.argv[1]], network.station_to_index[sys.argv[2]]
+    else:
+        source, target = network.station_to_index["Wimbledon"], network.station_to_index["Upminster"]
+    for graph, label in ((free, "no interchange penalty"), (penalised, "5 minute interchange penalty")):
+        cost, legs = graph.route(source, target)
+        print(f"\n{network.stations[source]} to {network.stations[target]}, {label}: {cost} minutes, "
+              f"{len(legs) - 1} change(s)")
+        for line in graph.describe(legs):
+            print("    " + line)
+
+    random.seed(1828)
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(2000)]
+    start = time.perf_counter()
+    for s, t in pairs:
+        shortest_route(station_graph, s, t)
+    station_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for s, t in pairs:
+        penalised.route(s, t)
+    line_time = time.perf_counter() - start
+    print(f"\nPer query: station graph {station_time / len(pairs) * 1e6:.0f} us, "
+          f"line graph {line_time / len(pairs) * 1e6:.0f} us")
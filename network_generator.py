@@ -0,0 +1,168 @@
+from array import array
+import numpy as np
+from adjacency_list_graph import AdjacencyListGraph, Edge  # From "Introduction to Algorithms" (4th edition)
+
+# Share of each journey time (1 to 5 minutes) among the sections of the real network
+TUBE_WEIGHTS = (1, 2, 3, 4, 5)
+TUBE_WEIGHT_SHARES = (0.07, 0.57, 0.23, 0.09, 0.04)
+
+
+def _to_arrays(tails, heads, weights):
+    """Convert NumPy edge columns into the array.array form CSRGraph.from_arrays expects."""
+    weight_type = 'q' if np.issubdtype(weights.dtype, np.integer) else 'd'
+    return (array('i', tails.astype(np.int32).tobytes()), array('i', heads.astype(np.int32).tobytes()),
+            array(weight_type, weights.astype(np.int64 if weight_type == 'q' else np.float64).tobytes()))
+
+
+def _pair_from_index(n, k):
+    """
+    Map positions k in the row-by-row listing of the pairs u < v of n vertices back to (u, v).
+    The closed-form row is corrected by one where floating-point rounding puts it off by one.
+    """
+    u = (n - 2 - np.floor(np.sqrt(-8.0 * k + 4.0 * n * (n - 1) - 7) / 2 - 0.5)).astype(np.int64)
+    row_start = u * (2 * n - u - 1) // 2
+    u -= (k < row_start)
+    row_start = u * (2 * n - u - 1) // 2
+    next_start = (u + 1) * (2 * n - u - 2) // 2
+    u += (k >= next_start)
+    row_start = u * (2 * n - u - 1) // 2
+    return u, k - row_start + u + 1
+
+
+def random_network(n, edge_probability=0.1, min_weight=1, max_weight=15, seed=None):
+    """
+    Random network in which every pair of stations is joined with probability edge_probability.
+    Instead of drawing one random number per pair, the gaps between consecutive edges in the
+    row-by-row listing of the pairs are drawn in bulk from a geometric distribution, so the
+    cost is proportional to the number of edges rather than to n^2.
+    Arguments:
+        n -- number of stations (vertices)
+        edge_probability -- probability of an edge (journey) existing between two stations
+        min_weight -- minimum journey duration in minutes
+        max_weight -- maximum journey duration in minutes
+        seed -- seed of the random generator (None for a fresh one)
+    Returns:
+        tails, heads, weights -- the edges (u < v, listed by u and then v) as parallel arrays
+    """
+    rng = np.random.default_rng(seed)
+    pair_count = n * (n - 1) // 2
+    if pair_count == 0 or edge_probability <= 0:
+        positions = np.zeros(0, dtype=np.int64)
+    elif edge_probability >= 1:
+        positions = np.arange(pair_count, dtype=np.int64)
+    else:
+        chunks = []
+        last = -1
+        chunk_size = int(pair_count * edge_probability * 1.05) + 64
+        while last < pair_count:
+            gaps = rng.geometric(edge_probability, size=chunk_size)
+            chunk = last + np.cumsum(gaps)
+            last = int(chunk[-1])
+            chunks.append(chunk[chunk < pair_count])
+        positions = np.concatenate(chunks)
+    tails, heads = _pair_from_index(n, positions)
+    weights = rng.integers(min_weight, max_weight + 1, size=len(positions))
+    return _to_arrays(tails, heads, weights)
+
+
+def tube_network(n, line_length=22, crossings=4, branch_probability=0.5, seed=None):
+    """
+    Tube-like network: long lines of stations that cross earlier lines at a few interchanges,
+    some of them branching off an existing station. With the defaults the degrees (mostly 2, a
+    few termini and interchanges) and journey times follow those of the real network.
+    Arguments:
+        n -- number of stations (vertices)
+        line_length -- number of stations of each line before the interchanges are added
+        crossings -- number of earlier-line stations each line passes through
+        branch_probability -- probability that a line starts at a station of an earlier line
+        seed -- seed of the random generator (None for a fresh one)
+    Returns:
+        tails, heads, weights -- the edges (u < v, each pair once) as parallel arrays
+    """
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, n, line_length)
+    ends = np.minimum(starts + line_length, n)
+
+    # Every line starts as a chain of consecutive stations.
+    keep = np.ones(max(n - 1, 0), dtype=bool)
+    keep[starts[1:] - 1] = False  # no section between the last station of a line and the next line
+    extra_tails, extra_heads = [], []
+
+    for start, end in zip(starts[1:], ends[1:]):
+        sections = end - start - 1
+        count = min(crossings, sections)
+        if count:
+            # Route the line through a station of an earlier line in place of a direct section.
+            chosen = start + rng.choice(sections, size=count, replace=False)
+            others = rng.integers(0, start, size=count)
+            keep[chosen] = False
+            extra_tails.extend((chosen, others))
+            extra_heads.extend((others, chosen + 1))
+        if count == 0 or rng.random() < branch_probability:
+            extra_tails.append(np.array([start]))
+            extra_heads.append(rng.integers(0, start, size=1))
+
+    chain = np.flatnonzero(keep)  # section i joins stations i and i + 1
+    tails = np.concatenate([chain] + extra_tails)
+    heads = np.concatenate([chain + 1] + extra_heads)
+
+    # Number the stations at random, as the alphabetical numbering of the real network does.
+    relabel = rng.permutation(n)
+    tails, heads = relabel[tails], relabel[heads]
+    low, high = np.minimum(tails, heads), np.maximum(tails, heads)
+    keys = np.unique(low.astype(np.int64) * n + high)  # drop repeated pairs, listing the rest by u and then v
+    weights = rng.choice(TUBE_WEIGHTS, size=len(keys), p=TUBE_WEIGHT_SHARES)
+    return _to_arrays(keys // n, keys % n, weights)
+
+
+def to_adjacency_list_graph(card_V, tails, heads, weights):
+    """
+    Bulk constructor for an undirected, weighted AdjacencyListGraph from edge arrays.
+    The generators above never repeat a pair, so the linear duplicate check of insert_edge is
+    skipped; the adjacency lists come out exactly as if insert_edge had been called per edge.
+    """
+    graph = AdjacencyListGraph(card_V, directed=False, weighted=True)
+    adj_lists = graph.get_adj_lists()
+    for i in range(len(tails)):
+        u, v, weight = tails[i], heads[i], weights[i]
+        adj_lists[u].append(Edge(v, weight))
+        adj_lists[v].append(Edge(u, weight))
+    graph.card_E = len(tails)
+    return graph
+
+
+# Testing
+if __name__ == "__main__":
+
+    import time
+    from collections import Counter
+    from csr_graph import CSRGraph
+    from stop_count import bfs_csr
+
+    # Every pair is drawn with the right probability: compare against the expected edge count.
+    for n, p in ((2000, 0.1), (100000, 0.00003)):
+        start = time.perf_counter()
+        tails, heads, weights = random_network(n, p, seed=1828)
+        elapsed = time.perf_counter() - start
+        pairs = set(zip(tails, heads))
+        if len(pairs) != len(tails) or any(u >= v for u, v in pairs):
+            raise RuntimeError("Random network has repeated or badly ordered pairs")
+        print(f"random_network(n = {n}, p = {p}): {len(tails)} edges (expected {p * n * (n - 1) / 2:.0f}) "
+              f"in {elapsed * 1000:.0f} ms")
+
+    for n in (270, 2000, 100000, 500000):
+        start = time.perf_counter()
+        arrays = tube_network(n, seed=1828)
+        generated = time.perf_counter() - start
+        graph = CSRGraph.from_arrays(n, *arrays)
+        built = time.perf_counter() - generated - start
+        dist, _ = bfs_csr(graph, 0)
+        if float('inf') in dist:
+            raise RuntimeError("Tube-like network is not connected")
+        degrees = Counter(graph.degree(u) for u in range(n))
+        print(f"tube_network(n = {n}): {len(arrays[0])} sections, generated in {generated * 1000:.0f} ms, "
+              f"CSR built in {built * 1000:.0f} ms, degrees {sorted(degrees.items())[:7]}")
+
+    start = time.perf_counter()
+    to_adjacency_list_graph(2000, *random_network(2000, 0.1, seed=1828))
+    print(f"AdjacencyListGraph with n = 2000, p = 0.1 built in {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,259 @@
+import hashlib
+import mmap
+import os
+import struct
+import time
+from array import array
+import instrumentation
+from csr_graph import CSRGraph
+from station_index import StationIndex
+
+SNAPSHOT_MAGIC = b"LUNETSNP"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_DIR = ".network_cache"  # created next to the workbook
+# magic, version, workbook SHA-256, stations, lines, sections, kept edges, bytes of names, bytes of station index
+_HEADER = struct.Struct("<8sI32sIIIIII")
+
+
+class Network:
+    """
+    The London Underground network as parsed from the workbook.
+    Every valid row of the workbook is a section (u, v, duration, line). The kept sections
+    are the distinct station pairs, in the same first-come order as the added_edges dedup
+    of the Task scripts, and form the station graph.
+    """
+
+    def __init__(self, stations, lines, section_u, section_v, section_weight, section_line, kept, index=None):
+        """
+        Arguments:
+            stations -- sorted station names; a station's index is its vertex number
+            lines -- sorted line names
+            section_u, section_v -- station indices of every section
+            section_weight -- journey time of every section in minutes
+            section_line -- line index of every section
+            kept -- indices of the sections that make up the station graph
+            index -- StationIndex of the station names (built on first use if not given)
+        """
+        self.stations = stations
+        self.lines = lines
+        self.section_u = section_u
+        self.section_v = section_v
+        self.section_weight = section_weight
+        self.section_line = section_line
+        self.kept = kept
+        self.station_to_index = {station: index for index, station in enumerate(stations)}
+        self.index = index
+
+    def get_card_V(self):
+        """Return the number of stations."""
+        return len(self.stations)
+
+    def station_index(self):
+        """Return the StationIndex for looking up, completing and correcting station names."""
+        if self.index is None:
+            self.index = StationIndex(self.stations)
+        return self.index
+
+    def first_seen_order(self):
+        """
+        Return the station indices in the order the workbook first lists them: down the first
+        station column, then down the second. This is the numbering of the original Task
+        scripts, which some tie-breaks (such as the order Kruskal meets equal weights) depend on.
+        """
+        return list(dict.fromkeys(list(self.section_u) + list(self.section_v)))
+
+    def edges(self):
+        """Return the distinct sections as (u, v, duration) tuples."""
+        return [(self.section_u[i], self.section_v[i], self.section_weight[i]) for i in self.kept]
+
+    def graph(self, metric="time"):
+        """
+        Build the station graph as a CSRGraph.
+        Arguments:
+            metric -- "time" for journey times in minutes, "stops" for one per section
+        """
+        tails = array('i', (self.section_u[i] for i in self.kept))
+        heads = array('i', (self.section_v[i] for i in self.kept))
+        if metric == "time":
+            costs = [self.section_weight[i] for i in self.kept]
+        elif metric == "stops":
+            costs = [1] * len(self.kept)
+        else:
+            raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+        return CSRGraph.from_arrays(len(self.stations), tails, heads, costs, directed=False, weighted=True)
+
+
+def resolve_workbook(file_path):
+    """Return file_path, or a file in the same folder whose name only differs in case."""
+    if os.path.exists(file_path):
+        return file_path
+    folder, name = os.path.split(file_path)
+    for candidate in os.listdir(folder or "."):
+        if candidate.lower() == name.lower():
+            return os.path.join(folder, candidate)
+    raise FileNotFoundError(file_path)
+
+
+def parse_workbook(file_path):
+    """
+    Parse the workbook with pandas and normalise it: drop rows without both stations and a
+    duration (the station listings), strip station names and keep each station pair once.
+    """
+    import pandas as pd  # only needed when there is no snapshot yet
+
+    data = pd.read_excel(file_path, header=None)
+    data.columns = ["Line", "Station1", "Station2", "Duration"]
+    data = data.dropna(subset=["Station1", "Station2", "Duration"])
+    data["Station1"] = data["Station1"].astype(str).str.strip()
+    data["Station2"] = data["Station2"].astype(str).str.strip()
+    data["Line"] = data["Line"].fillna("Unknown").astype(str).str.strip()
+
+    stations = sorted(set(data["Station1"]).union(set(data["Station2"])))
+    lines = sorted(set(data["Line"]))
+    station_to_index = {station: index for index, station in enumerate(stations)}
+    line_to_index = {line: index for index, line in enumerate(lines)}
+
+    section_u, section_v = array('i'), array('i')
+    section_weight, section_line = array('d'), array('i')
+    kept = array('i')
+    added_edges = set()  # Track added station pairs to avoid duplicates
+    for line, station1, station2, duration in zip(data["Line"], data["Station1"], data["Station2"], data["Duration"]):
+        u, v = station_to_index[station1], station_to_index[station2]
+        if (u, v) not in added_edges and (v, u) not in added_edges:
+            kept.append(len(section_u))
+            added_edges.add((u, v))
+        section_u.append(u)
+        section_v.append(v)
+        section_weight.append(float(duration))
+        section_line.append(line_to_index[line])
+    return Network(stations, lines, section_u, section_v, section_weight, section_line, kept)
+
+
+def workbook_hash(file_path):
+    """Return the SHA-256 digest of the workbook's bytes."""
+    with open(file_path, "rb") as file:
+        return hashlib.sha256(file.read()).digest()
+
+
+def snapshot_path(file_path, digest):
+    """Return where the snapshot of a workbook with the given digest is stored."""
+    folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), SNAPSHOT_DIR)
+    name = os.path.splitext(os.path.basename(file_path))[0].replace(" ", "_")
+    return os.path.join(folder, f"{name}.{digest.hex()[:16]}.v{SNAPSHOT_VERSION}.bin")
+
+
+def _padding(offset):
+    return (-offset) % 8  # keep every array 8-byte aligned in the file
+
+
+def write_snapshot(path, network, digest):
+    """
+    Write the network as a binary snapshot: a fixed header, the station and line names as
+    UTF-8 text, then the section arrays and the packed station index, each 8-byte aligned so
+    they can be memory-mapped.
+    """
+    names = "\n".join(list(network.stations) + list(network.lines)).encode("utf-8")
+    index = network.station_index().pack()
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, digest, len(network.stations), len(network.lines),
+                          len(network.section_u), len(network.kept), len(names), len(index))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(header)
+        file.write(names)
+        offset = len(header) + len(names)
+        for values in (network.section_weight, network.section_u, network.section_v,
+                       network.section_line, network.kept):
+            file.write(bytes(_padding(offset)))
+            offset += _padding(offset)
+            data = array(values.typecode, values).tobytes()
+            file.write(data)
+            offset += len(data)
+        file.write(bytes(_padding(offset)))
+        file.write(index)
+    os.replace(temporary, path)  # readers never see a half-written snapshot
+
+
+def read_snapshot(path, digest=None):
+    """
+    Memory-map a snapshot and return the Network, with the section arrays as views into the file.
+    Returns None if the file is missing, of another version or for another workbook.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buffer) < _HEADER.size:
+        return None
+    magic, version, stored_digest, card_V, card_L, sections, kept, names_size, index_size = _HEADER.unpack_from(buffer)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION or (digest is not None and digest != stored_digest):
+        return None
+
+    offset = _HEADER.size
+    names = bytes(buffer[offset:offset + names_size]).decode("utf-8").split("\n") if names_size else []
+    offset += names_size
+    view = memoryview(buffer)
+    arrays = []
+    for typecode, count in (('d', sections), ('i', sections), ('i', sections), ('i', sections), ('i', kept)):
+        offset += _padding(offset)
+        size = struct.calcsize(typecode) * count
+        arrays.append(view[offset:offset + size].cast(typecode))
+        offset += size
+    section_weight, section_u, section_v, section_line, kept_sections = arrays
+    offset += _padding(offset)
+    stations = names[:card_V]
+    index = StationIndex.unpack(stations, view[offset:offset + index_size])
+    return Network(stations, names[card_V:card_V + card_L], section_u, section_v, section_weight,
+                   section_line, kept_sections, index)
+
+
+def load_network(file_path="London Underground Data.xlsx", use_snapshot=True):
+    """
+    Load the network, from its binary snapshot when one exists for this exact workbook.
+    The first run parses the workbook with pandas and writes the snapshot; later runs only
+    hash the workbook and memory-map the snapshot, without importing pandas or openpyxl.
+    Arguments:
+        file_path -- path to the workbook
+        use_snapshot -- set to False to always parse the workbook
+    Returns:
+        network -- the Network
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    file_path = resolve_workbook(file_path)
+    network = None
+    if use_snapshot:
+        digest = workbook_hash(file_path)
+        path = snapshot_path(file_path, digest)
+        network = read_snapshot(path, digest)
+    from_snapshot = network is not None
+    if network is None:
+        network = parse_workbook(file_path)
+        if use_snapshot:
+            write_snapshot(path, network, digest)
+    if instrumentation.active:
+        instrumentation.record("load", time.perf_counter_ns() - start, snapshots=int(from_snapshot),
+                               stations=len(network.stations), sections=len(network.section_u))
+    return network
+
+
+# Testing
+if __name__ == "__main__":
+
+    import sys
+    import time
+
+    start = time.perf_counter()
+    network = load_network(use_snapshot=False)
+    parse_time = time.perf_counter() - start
+    load_network()  # make sure the snapshot exists
+
+    start = time.perf_counter()
+    cached = load_network()
+    snapshot_time = time.perf_counter() - start
+    if cached.stations != network.stations or cached.edges() != network.edges():
+        raise RuntimeError("Snapshot does not match the workbook")
+
+    print(f"{len(network.stations)} stations, {len(network.lines)} lines, "
+          f"{len(network.section_u)} sections, {len(network.kept)} distinct station pairs")
+    print(f"Parsing the workbook: {parse_time * 1000:.1f} ms, loading the snapshot: {snapshot_time * 1000:.2f} ms")
+    print("pandas imported by the snapshot path:", "no" if "pandas" not in sys.modules else "only by the parse above")
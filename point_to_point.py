@@ -0,0 +1,282 @@
+import heapq
+import time
+import instrumentation
+from csr_graph import dijkstra_csr
+
+
+class SearchStats:
+    """Counters filled in by the point-to-point searches, to compare the size of their search spaces."""
+
+    def __init__(self):
+        self.settled = 0  # vertices whose distance became final, summed over both directions
+
+    def __str__(self):
+        return f"settled={self.settled}"
+
+
+def shortest_route(G, source, target, stats=None):
+    """
+    Find the shortest route between two stations, stopping as soon as the target is settled.
+    Uses a binary heap with lazy deletion: improved vertices are pushed again and stale
+    entries are skipped when popped, so no decrease-key is needed.
+    Arguments:
+        G -- the tube network as a CSRGraph, with nonnegative weights
+        source -- index of the source station
+        target -- index of the destination station
+        stats -- optional SearchStats to fill in
+    Returns:
+        distance -- length of the shortest route (float('inf') if the target is unreachable)
+        path -- station indices from source to target (empty if the target is unreachable)
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    offsets, targets, weights = G.offsets, G.targets, G.weights
+    inf = float('inf')
+    d = {source: 0}
+    pi = {source: None}
+    done = set()
+    heap = [(0, source)]
+    stale = 0
+    while heap:
+        du, u = heapq.heappop(heap)
+        if u in done:  # stale entry
+            stale += 1
+            continue
+        if u == target:  # early exit: the target's distance is final
+            break
+        done.add(u)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            dv = du + weights[i]
+            if dv < d.get(v, inf):  # never true over a closed (infinite) arc
+                d[v] = dv
+                pi[v] = u
+                heapq.heappush(heap, (dv, v))
+    if stats is not None:
+        stats.settled += len(done) + (target in d)  # the target is settled but never added to done
+    if instrumentation.active:
+        # The search stops early, so whatever is left in the heap was pushed but never popped.
+        elapsed = time.perf_counter_ns() - start
+        pops = len(done) + stale + (target in d)
+        instrumentation.record("point-to-point", elapsed, settled=len(done) + (target in d), pushes=pops + len(heap),
+                               pops=pops, decrease_keys=pops + len(heap) - len(d),
+                               relaxations=sum(offsets[u + 1] - offsets[u] for u in done))
+    if target not in d:
+        return float('inf'), []
+    return d[target], build_path(pi, target)
+
+
+def build_path(pi, target):
+    """Walk the predecessors back from target and return the path from the source to target."""
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    path = []
+    while target is not None:
+        path.append(target)
+        target = pi[target]
+    path.reverse()
+    if instrumentation.active:
+        instrumentation.record("path", time.perf_counter_ns() - start, stations=len(path))
+    return path
+
+
+def bidirectional_route(G, source, target, stats=None):
+    """
+    Find the shortest route by growing a forward search from source and a backward search
+    from target in turns, always advancing the side with the smaller queue head. The search
+    stops once the two queue heads together cannot beat the best meeting point found so far.
+    Arguments:
+        G -- the tube network as an undirected CSRGraph, with nonnegative weights
+        source -- index of the source station
+        target -- index of the destination station
+        stats -- optional SearchStats to fill in
+    Returns:
+        distance -- length of the shortest route (float('inf') if the target is unreachable)
+        path -- station indices from source to target (empty if the target is unreachable)
+    """
+    if G.is_directed():
+        raise RuntimeError("Bidirectional search needs an undirected graph.")
+    if source == target:
+        if stats is not None:
+            stats.settled += 1
+        return 0, [source]
+
+    offsets, targets, weights = G.offsets, G.targets, G.weights
+    inf = float('inf')
+    d = ({source: 0}, {target: 0})  # forward and backward distances
+    pi = ({source: None}, {target: None})
+    done = (set(), set())
+    heaps = ([(0, source)], [(0, target)])
+    best = float('inf')  # length of the best route through a meeting vertex
+    meeting = None
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] + heaps[1][0][0] >= best:  # neither side can improve on best any more
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        du, u = heapq.heappop(heaps[side])
+        if u in done[side]:  # stale entry
+            continue
+        done[side].add(u)
+        dist, other = d[side], d[1 - side]
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            dv = du + weights[i]
+            if dv < dist.get(v, inf):  # never true over a closed (infinite) arc
+                dist[v] = dv
+                pi[side][v] = u
+                heapq.heappush(heaps[side], (dv, v))
+            if v in other and dv + other[v] < best:  # the two searches touch at v
+                best = dv + other[v]
+                meeting = v
+
+    if stats is not None:
+        stats.settled += len(done[0]) + len(done[1])
+    if meeting is None:
+        return float('inf'), []
+    # The forward tree gives source..meeting, the backward tree gives meeting..target.
+    path = build_path(pi[0], meeting)
+    v = pi[1][meeting]
+    while v is not None:
+        path.append(v)
+        v = pi[1][v]
+    return best, path
+
+
+class Landmarks:
+    """
+    Precomputed ALT (A*, landmarks, triangle inequality) heuristic for an undirected graph.
+    The Excel data has no coordinates, so the lower bound on dist(v, t) comes from the exact
+    distances to a few landmark stations: |dist(l, t) - dist(l, v)| <= dist(v, t) for every l.
+    """
+
+    def __init__(self, G, count=8, first=0):
+        """
+        Pick landmarks by farthest-point selection and run Dijkstra from each of them.
+        Arguments:
+            G -- the tube network as an undirected CSRGraph
+            count -- number of landmarks
+            first -- station used to seed the farthest-point selection
+        """
+        if G.is_directed():
+            raise RuntimeError("ALT landmarks need an undirected graph.")
+        self.landmarks = []
+        self.distances = []  # distances[i][v] = dist(landmarks[i], v)
+        closest = [float('inf')] * G.get_card_V()  # distance to the nearest landmark chosen so far
+        d, _ = dijkstra_csr(G, first)
+        for _ in range(min(count, G.get_card_V())):
+            # The next landmark is the reachable vertex farthest from all the landmarks so far.
+            candidates = [v for v in range(G.get_card_V()) if d[v] != float('inf') and v not in self.landmarks]
+            if not candidates:
+                break
+            landmark = max(candidates, key=lambda v: closest[v] if self.landmarks else d[v])
+            d, _ = dijkstra_csr(G, landmark)
+            self.landmarks.append(landmark)
+            self.distances.append(d)
+            closest = [min(closest[v], d[v]) for v in range(G.get_card_V())]
+
+
+def astar_route(G, source, target, landmarks, stats=None):
+    """
+    Find the shortest route with A* search guided by ALT landmarks.
+    The heap is keyed on distance plus the landmark lower bound, so the search is pulled
+    towards the target and stops as soon as the target is settled.
+    Arguments:
+        G -- the tube network as a CSRGraph, with nonnegative weights
+        source -- index of the source station
+        target -- index of the destination station
+        landmarks -- Landmarks precomputed for G
+        stats -- optional SearchStats to fill in
+    Returns:
+        distance -- length of the shortest route (float('inf') if the target is unreachable)
+        path -- station indices from source to target (empty if the target is unreachable)
+    """
+    offsets, targets, weights = G.offsets, G.targets, G.weights
+    inf = float('inf')
+    # Cache dist(l, t) once per query, so each heuristic call only looks up dist(l, v).
+    to_target = [(d, d[target]) for d in landmarks.distances if d[target] != float('inf')]
+
+    def h(v):
+        bound = 0
+        for d, dt in to_target:
+            if d[v] != float('inf'):
+                bound = max(bound, abs(dt - d[v]))
+        return bound
+
+    d = {source: 0}
+    pi = {source: None}
+    done = set()
+    heap = [(h(source), source)]
+    while heap:
+        _, u = heapq.heappop(heap)
+        if u in done:  # stale entry
+            continue
+        if u == target:  # the heuristic is consistent, so the target's distance is final
+            break
+        done.add(u)
+        du = d[u]
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            dv = du + weights[i]
+            if dv < d.get(v, inf):  # never true over a closed (infinite) arc
+                d[v] = dv
+                pi[v] = u
+                heapq.heappush(heap, (dv + h(v), v))
+    if stats is not None:
+        stats.settled += len(done) + (target in d)
+    if target not in d:
+        return float('inf'), []
+    return d[target], build_path(pi, target)
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    from csr_graph import CSRGraph
+    from network_loader import load_network
+
+    def compare(name, graph, pairs, landmarks):
+        """Check that every search agrees with full Dijkstra and report the settled vertices per query."""
+        totals = {"dijkstra": 0, "early exit": 0, "bidirectional": 0, "A* (ALT)": 0}
+        for source, target in pairs:
+            d, _ = dijkstra_csr(graph, source)
+            totals["dijkstra"] += sum(1 for x in d if x != float('inf'))
+            for label, search in (("early exit", lambda s: shortest_route(graph, source, target, s)),
+                                  ("bidirectional", lambda s: bidirectional_route(graph, source, target, s)),
+                                  ("A* (ALT)", lambda s: astar_route(graph, source, target, landmarks, s))):
+                stats = SearchStats()
+                distance, path = search(stats)
+                if distance != d[target]:
+                    raise RuntimeError(f"{label} returned {distance} instead of {d[target]} for {source} -> {target}")
+                totals[label] += stats.settled
+        print(f"{name}: average settled vertices over {len(pairs)} queries")
+        for label, total in totals.items():
+            print(f"    {label:>14}: {total / len(pairs):.1f}")
+
+    # A closed section must not be used, even when it is the only way through.
+    line = CSRGraph.from_edges(4, [(0, 1, 2), (1, 2, 3), (2, 3, 1)])
+    closed = line.without_edges([(1, 2)])
+    landmarks = Landmarks(closed, count=2)
+    for label, result in (("early exit", shortest_route(closed, 0, 2)),
+                          ("bidirectional", bidirectional_route(closed, 0, 2)),
+                          ("A* (ALT)", astar_route(closed, 0, 2, landmarks))):
+        if result != (float('inf'), []):
+            raise RuntimeError(f"{label} routed through a closed section: {result}")
+    if list(closed.neighbors(1)) != [(0, 2)] or closed.degree(2) != 1 or \
+            [edge.get_v() for edge in closed.get_adj_list(1)] != [0]:
+        raise RuntimeError("A closure view still lists the closed section")
+    print("Closed sections are skipped by every search and accessor")
+
+    random.seed(1828)
+
+    # The real network.
+    network = load_network("London Underground Data.xlsx")
+    stations = network.stations
+    tube = network.graph("time")
+    pairs = [(random.randrange(len(stations)), random.randrange(len(stations))) for _ in range(200)]
+    compare("London Underground", tube, pairs, Landmarks(tube))
+
+    # A synthetic network like generate_random_tube_network in Task 1(b).
+    n = 1000
+    edge_list = [(u, v, random.randint(1, 15)) for u in range(n) for v in range(u + 1, n) if random.random() < 0.01]
+    synthetic = CSRGraph.from_edges(n, edge_list)
+    pairs = [(random.randrange(n), random.randrange(n)) for _ in range(200)]
+    compare(f"Synthetic network (n = {n})", synthetic, pairs, Landmarks(synthetic))
@@ -0,0 +1,176 @@
+import sys
+from collections import OrderedDict
+from adjacency_list_graph import AdjacencyListGraph  # From "Introduction to Algorithms" (4th edition)
+from csr_graph import CSRGraph, dijkstra_csr
+from stop_count import bfs_csr
+
+ENGINES = {"time": dijkstra_csr, "stops": bfs_csr}
+
+
+class WatchedGraph(AdjacencyListGraph):
+    """
+    AdjacencyListGraph that tells its listeners about every edge it inserts or deletes,
+    so caches built on top of it (such as RouteCache) stay correct when sections close.
+    """
+
+    def __init__(self, card_V, directed=True, weighted=False):
+        super().__init__(card_V, directed, weighted)
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """Register listener(kind, u, v), called after each change with kind "insert" or "delete"."""
+        self.listeners.append(listener)
+
+    def insert_edge(self, u, v, weight=None):
+        super().insert_edge(u, v, weight)
+        for listener in self.listeners:
+            listener("insert", u, v)
+
+    def delete_edge(self, u, v, delete_undirected=True):
+        existed = self.has_edge(u, v)
+        super().delete_edge(u, v, delete_undirected)
+        if existed:
+            for listener in self.listeners:
+                listener("delete", u, v)
+
+
+class RouteCache:
+    """
+    LRU cache of shortest-path trees keyed on (source station, metric).
+    A cached tree answers a query to any destination by walking its predecessors, i.e. in
+    O(path length). Trees are evicted least recently used first once the memory budget is
+    exceeded. When the graph is a WatchedGraph, deleting an edge drops exactly the trees that
+    use it, and inserting an edge drops every tree, since any of them might improve.
+    """
+
+    def __init__(self, graph, memory_budget=64 * 1024 * 1024):
+        """
+        Arguments:
+            graph -- a CSRGraph (never changes) or an AdjacencyListGraph, ideally a WatchedGraph
+            memory_budget -- approximate number of bytes the cached trees may occupy
+        """
+        self.graph = graph
+        self.memory_budget = memory_budget
+        self.trees = OrderedDict()  # (source, metric) -> (distances, predecessors, size in bytes)
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._frozen = graph if isinstance(graph, CSRGraph) else None
+        if isinstance(graph, WatchedGraph):
+            graph.add_listener(self._on_change)
+
+    def _csr(self):
+        """Return a CSR snapshot of the current graph, rebuilding it after a change."""
+        if self._frozen is None:
+            self._frozen = CSRGraph.from_adjacency_list_graph(self.graph)
+        return self._frozen
+
+    def _on_change(self, kind, u, v):
+        self._frozen = None
+        if kind == "insert":
+            self.invalidations += len(self.trees)
+            self.clear()
+            return
+        # A deleted edge only matters to the trees that route through it.
+        for key in [key for key, (_, pi, _) in self.trees.items() if pi[v] == u or pi[u] == v]:
+            self._drop(key)
+            self.invalidations += 1
+
+    def _drop(self, key):
+        _, _, size = self.trees.pop(key)
+        self.memory_used -= size
+
+    def clear(self):
+        """Empty the cache (the counters are kept)."""
+        self.trees.clear()
+        self.memory_used = 0
+
+    def tree(self, source, metric="time"):
+        """
+        Return the shortest-path tree (distances, predecessors) from source for a metric,
+        computing and caching it on a miss.
+        Arguments:
+            source -- index of the source station
+            metric -- "time" (journey time) or "stops" (number of stops)
+        """
+        key = (source, metric)
+        if key in self.trees:
+            self.hits += 1
+            self.trees.move_to_end(key)
+            d, pi, _ = self.trees[key]
+            return d, pi
+
+        self.misses += 1
+        if metric not in ENGINES:
+            raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+        d, pi = ENGINES[metric](self._csr(), source)
+        # Two lists of pointers plus one number object per reachable station.
+        size = sys.getsizeof(d) + sys.getsizeof(pi) + 24 * len(d)
+        self.trees[key] = (d, pi, size)
+        self.memory_used += size
+        while self.memory_used > self.memory_budget and len(self.trees) > 1:
+            self._drop(next(iter(self.trees)))  # least recently used first
+            self.evictions += 1
+        return d, pi
+
+    def route(self, source, target, metric="time"):
+        """
+        Answer a station-to-station query from the cached tree of source.
+        Returns:
+            distance -- length of the route (float('inf') if the target is unreachable)
+            path -- station indices from source to target (empty if unreachable)
+        """
+        d, pi = self.tree(source, metric)
+        if d[target] == float('inf'):
+            return d[target], []
+        path = []
+        v = target
+        while v is not None:
+            path.append(v)
+            v = pi[v]
+        path.reverse()
+        return d[target], path
+
+    def stats(self):
+        """Return the cache counters as a dictionary."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations, "entries": len(self.trees), "bytes": self.memory_used}
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    from mst import kruskal
+    from network_loader import load_network
+
+    random.seed(1828)
+    network = load_network("London Underground Data.xlsx")
+    graph = WatchedGraph(network.get_card_V(), directed=False, weighted=True)
+    for u, v, weight in network.edges():
+        graph.insert_edge(u, v, weight)
+
+    # Queries skewed towards a few popular origins, as in real usage.
+    popular = random.sample(range(network.get_card_V()), 10)
+    cache = RouteCache(graph, memory_budget=8 * 50 * 1024)
+    for _ in range(5000):
+        source = random.choice(popular) if random.random() < 0.9 else random.randrange(network.get_card_V())
+        target = random.randrange(network.get_card_V())
+        cache.route(source, target, random.choice(("time", "stops")))
+    print("After 5000 queries:", cache.stats())
+
+    # Close the sections that are not on the minimum spanning tree, as Task 4(b) does.
+    mst_edges = set(kruskal(graph).get_edge_list())
+    for u, v in set(graph.get_edge_list()) - mst_edges:
+        graph.delete_edge(u, v)
+    print("After the closures:", cache.stats())
+
+    # Cached answers must now agree with a fresh search on the reduced network.
+    fresh = RouteCache(graph)
+    for source in popular:
+        for target in range(network.get_card_V()):
+            if cache.route(source, target)[0] != fresh.route(source, target)[0]:
+                raise RuntimeError("Stale tree left in the cache")
+    print("All cached routes agree with the reduced network:", cache.stats())
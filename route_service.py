@@ -0,0 +1,295 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from point_to_point import shortest_route, build_path
+from route_cache import ENGINES
+
+MAX_BODY = 1 << 20  # largest request body accepted, in bytes
+
+_network = None  # the warm network, loaded once in every worker process
+_graphs = None  # its station graph for every metric
+
+
+def _init_worker(file_path):
+    """Load the network and build the graph of every metric once per worker process."""
+    global _network, _graphs
+    from network_loader import load_network
+    _network = load_network(file_path)
+    _graphs = {metric: _network.graph(metric) for metric in ENGINES}
+
+
+def _answer(pairs, metric):
+    """
+    Route a batch of (source, target) station indices in a worker.
+    A source with one target gets an early-exit search; a source with several targets gets
+    one full shortest-path tree that answers all of them.
+    Returns:
+        answers -- (distance, path) for every pair, in order (distance None if unreachable)
+    """
+    graph = _graphs[metric]
+    targets_of = {}
+    for source, target in pairs:
+        targets_of.setdefault(source, set()).add(target)
+    trees = {source: ENGINES[metric](graph, source) for source, targets in targets_of.items() if len(targets) > 1}
+    answers = []
+    for source, target in pairs:
+        if source in trees:
+            d, pi = trees[source]
+            distance, path = d[target], build_path(pi, target) if d[target] != float('inf') else []
+        else:
+            distance, path = shortest_route(graph, source, target)
+        answers.append((None if distance == float('inf') else distance, path))
+    return answers
+
+
+class RouteService:
+    """
+    Long-running HTTP/JSON route planner. The network is loaded once when the service starts,
+    and every search runs in a process pool so the event loop keeps accepting connections.
+    Endpoints:
+        GET  /health   -- {"status": "ok", "stations": n}
+        GET  /stations -- {"stations": [names]}
+        POST /route    -- {"from": name, "to": name, "metric": "time" | "stops"}
+        POST /routes   -- {"pairs": [[from, to], ...], "metric": "time" | "stops"}
+    """
+
+    def __init__(self, file_path="London Underground Data.xlsx", processes=None):
+        """
+        Arguments:
+            file_path -- path to the workbook
+            processes -- number of worker processes (default: one per CPU core)
+        """
+        from network_loader import load_network
+        self.file_path = file_path
+        self.network = load_network(file_path)
+        self.processes = max(1, processes or os.cpu_count() or 1)
+        self.pool = None
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start the worker pool and listen on host:port (port 0 picks a free port). Returns the port."""
+        self.pool = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self.file_path,))
+        # Warm every worker up before the first request arrives.
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _answer, [(0, 0)], "time")
+                               for _ in range(self.processes)))
+        self.server = await asyncio.start_server(self._handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop listening and shut the worker pool down."""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def _read_head(self, reader):
+        """
+        Read the request line and headers of the next request on a connection.
+        Returns:
+            head -- (method, path, headers, body length), or None if the client closed the connection
+        Raises ValueError with the reason if they are not well-formed HTTP.
+        """
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:  # readline raises it for a line longer than the stream's limit
+            raise ValueError("Request line or header too long.") from None
+        parts = request_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) != 3:
+            raise ValueError("Malformed request line, expected 'METHOD /path HTTP/1.1'.")
+        length = headers.get("content-length", "0")
+        if not (length.isascii() and length.isdigit()):  # rejects a sign, spaces and non-ASCII digits
+            raise ValueError("Content-Length must be a non-negative integer.")
+        return parts[0], parts[1], headers, int(length)
+
+    async def _handle(self, reader, writer):
+        """Serve the requests of one connection, keeping it open between requests."""
+        try:
+            while True:
+                try:
+                    head = await self._read_head(reader)
+                except ValueError as error:
+                    head, status, body = None, 400, {"error": str(error)}
+                else:
+                    if head is None:
+                        break
+                    method, path, headers, length = head
+                    if length > MAX_BODY:
+                        status, body = 413, {"error": "Request body too large."}
+                    else:
+                        status, body = await self._dispatch(method, path, await reader.readexactly(length))
+                data = json.dumps(body).encode("utf-8")
+                # After a malformed head or a body that was not read, the connection is unusable for another request.
+                keep_alive = head is not None and head[2].get("connection", "").lower() != "close" and status != 413
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}"
+                             f"\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # the client went away
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        """Return (status, JSON-ready body) for one request."""
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "stations": self.network.get_card_V()}
+        if method == "GET" and path == "/stations":
+            return 200, {"stations": list(self.network.stations)}
+        if method != "POST" or path not in ("/route", "/routes"):
+            return 404, {"error": f"No endpoint {method} {path}."}
+        try:
+            query = json.loads(body or b"{}")
+            if not isinstance(query, dict):
+                raise ValueError("Request body must be a JSON object.")
+            metric = query.get("metric", "time")
+            if metric not in ENGINES:
+                raise ValueError("Unknown metric " + repr(metric) + ", expected 'time' or 'stops'.")
+            named = [(query["from"], query["to"])] if path == "/route" else query["pairs"]
+            pairs = [(self._station(source), self._station(target)) for source, target in named]
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": str(error)}
+
+        loop = asyncio.get_running_loop()
+        try:
+            answers = await loop.run_in_executor(self.pool, _answer, pairs, metric)
+        except BrokenProcessPool:
+            # A worker died; replace the pool so later requests can be served again.
+            self.pool.shutdown(wait=False)
+            self.pool = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(self.file_path,))
+            return 500, {"error": "A route worker failed; please retry."}
+        except Exception as error:
+            return 500, {"error": f"Route search failed: {error}"}
+        routes = [{"from": source, "to": target, "metric": metric, "distance": distance,
+                   "path": [self.network.stations[v] for v in stations]}
+                  for (source, target), (distance, stations) in zip(named, answers)]
+        return 200, routes[0] if path == "/route" else {"routes": routes}
+
+    def _station(self, name):
+        """Return the index of a station name, tolerating case, punctuation and small typos."""
+        return self.network.station_index().resolve(str(name))
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+async def request(host, port, method, path, body=None):
+    """Send one request to the service and return (status, decoded JSON body)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    payload = json.loads(await reader.readexactly(length))
+    writer.close()
+    await writer.wait_closed()
+    return status, payload
+
+
+# Testing
+if __name__ == "__main__":
+
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Serve station-to-station routes over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--self-test", action="store_true", help="start on a free port, query it and stop")
+    args = parser.parse_args()
+
+    async def self_test():
+        service = RouteService(processes=args.processes)
+        port = await service.start(args.host, 0)
+        stations = service.network.stations
+        graphs = {metric: service.network.graph(metric) for metric in ENGINES}
+        print(f"Serving {len(stations)} stations on {args.host}:{port} with {service.processes} worker(s)")
+
+        print("GET /health:", await request(args.host, port, "GET", "/health"))
+        print("POST /route:", await request(args.host, port, "POST", "/route",
+                                            {"from": "Wimbledon", "to": "Upminster", "metric": "stops"}))
+        print("Unknown station:", await request(args.host, port, "POST", "/route", {"from": "Nowhere", "to": "Bank"}))
+
+        # Malformed requests get a status and a JSON error, never a dropped connection.
+        for body in ([1, 2], "x", 3):
+            status, payload = await request(args.host, port, "POST", "/route", body)
+            if status != 400:
+                raise RuntimeError(f"Body {body!r} got {status} {payload} instead of 400")
+        for head in ("POST /route HTTP/1.1\r\nContent-Length: -5", "POST /route HTTP/1.1\r\nContent-Length: abc",
+                     "POST /route HTTP/1.1\r\nContent-Length: \u0661\u0662", "GARBAGE", "GET /health"):
+            reader, writer = await asyncio.open_connection(args.host, port)
+            writer.write(f"{head}\r\n\r\n".encode("utf-8"))
+            await writer.drain()
+            status_line = await reader.readline()
+            writer.close()
+            if not status_line.startswith(b"HTTP/1.1 400"):
+                raise RuntimeError(f"Request {head!r} got {status_line!r} instead of 400")
+        # Kill a worker: the request that finds the pool broken gets a 500, the next one is served.
+        try:
+            await asyncio.get_running_loop().run_in_executor(service.pool, os._exit, 1)
+        except BrokenProcessPool:
+            pass
+        status, payload = await request(args.host, port, "POST", "/route", {"from": "Bank", "to": "Oval"})
+        recovered, _ = await request(args.host, port, "POST", "/route", {"from": "Bank", "to": "Oval"})
+        if status != 500 or recovered != 200:
+            raise RuntimeError(f"Broken pool gave {status} then {recovered} instead of 500 then 200")
+        print("Malformed requests get 400, a broken worker pool 500, then the service recovers")
+
+        # Many concurrent single queries, then the same pairs as one batch; both must match a direct search.
+        random.seed(1828)
+        pairs = [(random.choice(stations), random.choice(stations)) for _ in range(200)]
+        start = time.perf_counter()
+        singles = await asyncio.gather(*(request(args.host, port, "POST", "/route", {"from": s, "to": t})
+                                         for s, t in pairs))
+        single_time = time.perf_counter() - start
+        start = time.perf_counter()
+        status, batch = await request(args.host, port, "POST", "/routes", {"pairs": pairs})
+        batch_time = time.perf_counter() - start
+        for (s, t), (_, single), routed in zip(pairs, singles, batch["routes"]):
+            expected, _ = shortest_route(graphs["time"], service.network.station_to_index[s],
+                                         service.network.station_to_index[t])
+            if single["distance"] != expected or routed["distance"] != expected:
+                raise RuntimeError(f"Service disagrees with a direct search for {s} -> {t}")
+        print(f"{len(pairs)} concurrent requests: {single_time * 1000:.0f} ms; "
+              f"one batch of {len(pairs)}: {batch_time * 1000:.0f} ms; all distances agree")
+        await service.close()
+
+    async def serve():
+        service = RouteService(processes=args.processes)
+        port = await service.start(args.host, args.port)
+        print(f"Serving {service.network.get_card_V()} stations on http://{args.host}:{port}")
+        try:
+            await service.server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(self_test() if args.self_test else serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,275 @@
+import re
+import struct
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# stations, word entries, distinct bigrams, bigram postings, bytes of text
+_HEADER = struct.Struct("<IIIII")
+
+
+def normalise(name):
+    """
+    Normalised form of a station name used as its lookup key: accents and case folded away,
+    apostrophes and full stops dropped, "&" spelt out and any other punctuation turned into
+    single spaces, so "King's Cross St. Pancras " and "kings cross st pancras" are the same key.
+    """
+    if name is None or name != name:  # None or NaN from an empty spreadsheet cell
+        return ""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    text = text.casefold().replace("&", " and ")
+    text = re.sub(r"['.]", "", text)
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def edit_distance(pattern_bits, length, text):
+    """
+    Levenshtein distance between a pattern and text with the bit-parallel algorithm of Myers
+    (as formulated by Hyyrö): one column of the dynamic-programming table per character of
+    text, held in the bits of two integers.
+    Arguments:
+        pattern_bits -- dictionary from each character of the pattern to the bitmask of its positions
+        length -- length of the pattern
+        text -- the string to compare with
+    """
+    if length == 0:
+        return len(text)
+    mask = (1 << length) - 1
+    high = 1 << (length - 1)
+    pv, mv, score = mask, 0, length
+    for c in text:
+        eq = pattern_bits.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+def _pattern_bits(pattern):
+    """Return the character bitmasks of a pattern, as edit_distance expects."""
+    bits = {}
+    for position, c in enumerate(pattern):
+        bits[c] = bits.get(c, 0) | (1 << position)
+    return bits
+
+
+def _bigrams(key):
+    """Return the bigrams of a key padded with "$" at both ends (len(key) + 1 of them)."""
+    padded = "$" + key + "$"
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+class StationIndex:
+    """
+    Station-name lookups for a planner front end. A station's ID is its vertex number.
+    - find: exact lookup of the normalised name in a hash map.
+    - complete: autocomplete over a sorted array of the name and of every word start in it,
+      so "pancras" finds King's Cross St. Pancras; two binary searches bound the matches.
+    - similar: typo-tolerant lookup. A bigram index counts the bigrams each name shares with
+      the query; one edit destroys at most two bigrams, so only names sharing enough of them
+      can be within the allowed distance, and only those get an exact edit-distance check.
+    The index packs into bytes so it can be stored in the network snapshot.
+    """
+
+    def __init__(self, names, keys=None, words=None, word_ids=None, grams=None, gram_offsets=None,
+                 gram_stations=None):
+        """
+        Build the index of a list of station names, or wrap the arrays of a packed index.
+        Arguments:
+            names -- station names; names[i] is station i
+            keys, words, word_ids, grams, gram_offsets, gram_stations -- as stored by pack
+        """
+        self.names = list(names)
+        self.keys = list(keys) if keys is not None else [normalise(name) for name in self.names]
+        self.by_key = {}
+        for station, key in enumerate(self.keys):
+            self.by_key.setdefault(key, station)
+
+        if words is None:
+            entries = sorted((key[start:], station) for station, key in enumerate(self.keys)
+                             for start in [0] + [m.end() for m in re.finditer(" ", key)])
+            words = [word for word, _ in entries]
+            word_ids = array('i', (station for _, station in entries))
+        self.words = list(words)
+        self.word_ids = word_ids
+
+        if grams is None:
+            postings = {}
+            for station, key in enumerate(self.keys):
+                for gram in sorted(set(_bigrams(key))):
+                    postings.setdefault(gram, array('i')).append(station)
+            grams = sorted(postings)
+            gram_offsets, gram_stations = array('i', [0]), array('i')
+            for gram in grams:
+                gram_stations.extend(postings[gram])
+                gram_offsets.append(len(gram_stations))
+        # Stations containing grams[g] are gram_stations[gram_offsets[g]:gram_offsets[g + 1]].
+        self.gram_position = {gram: g for g, gram in enumerate(grams)}
+        self.gram_offsets, self.gram_stations = gram_offsets, gram_stations
+
+    def __len__(self):
+        return len(self.names)
+
+    def find(self, name):
+        """Return the ID of the station with this name after normalisation, or None."""
+        return self.by_key.get(normalise(name))
+
+    def complete(self, prefix, limit=10):
+        """
+        Return up to limit station IDs whose name, or a word in it, starts with prefix.
+        Names that start with the prefix come first; ties are in alphabetical order.
+        """
+        key = normalise(prefix)
+        if not key:
+            return []
+        low = bisect_left(self.words, key)
+        high = bisect_left(self.words, key + "\x7f", low)  # every normalised character sorts below \x7f
+        matches = set(self.word_ids[i] for i in range(low, high))
+        ranked = sorted(matches, key=lambda station: (not self.keys[station].startswith(key), self.keys[station]))
+        return ranked[:limit]
+
+    def similar(self, name, max_distance=2):
+        """
+        Return (edit distance, station ID) for every station whose normalised name is within
+        max_distance edits of name, closest first.
+        """
+        key = normalise(name)
+        shared = Counter()
+        for gram in _bigrams(key):  # a repeated gram counts each time: an overestimate, never an underestimate
+            g = self.gram_position.get(gram)
+            if g is not None:
+                shared.update(self.gram_stations[self.gram_offsets[g]:self.gram_offsets[g + 1]])
+        bits, length = _pattern_bits(key), len(key)
+        found = []
+        for station in range(len(self.keys)) if length + 1 <= 2 * max_distance else shared:
+            other = self.keys[station]
+            # Names within max_distance edits share at least max(lengths) + 1 - 2 * max_distance bigrams.
+            if abs(len(other) - length) > max_distance or \
+                    shared[station] < max(len(other), length) + 1 - 2 * max_distance:
+                continue
+            distance = edit_distance(bits, length, other)
+            if distance <= max_distance:
+                found.append((distance, station))
+        found.sort(key=lambda match: (match[0], self.keys[match[1]]))
+        return found
+
+    def resolve(self, name, max_distance=2):
+        """
+        Return the ID of the station a user most likely meant: an exact match after
+        normalisation, otherwise the only closest station within max_distance edits.
+        Raises ValueError if that is not one station, suggesting the tied closest stations, else
+        the stations whose names the query starts, else any within max_distance + 2 edits.
+        """
+        station = self.find(name)
+        if station is not None:
+            return station
+        matches = self.similar(name, max_distance)
+        if matches and (len(matches) == 1 or matches[0][0] < matches[1][0]):
+            return matches[0][1]
+        # Close but tied matches first, then names the query starts, then looser spelling matches.
+        candidates = [station for _, station in matches] or self.complete(name, 5) or \
+            [station for _, station in self.similar(name, max_distance + 2)]
+        suggestions = [self.names[station] for station in candidates[:5]]
+        hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+        raise ValueError(f"Unknown station {name!r}.{hint}")
+
+    def pack(self):
+        """Serialise the index: a header, the keys, words and bigrams as UTF-8 text, then the int arrays."""
+        grams = sorted(self.gram_position, key=self.gram_position.get)
+        text = "\n".join(self.keys + self.words + grams).encode("utf-8")
+        data = _HEADER.pack(len(self.keys), len(self.words), len(grams), len(self.gram_stations), len(text)) + text
+        for values in (self.word_ids, self.gram_offsets, self.gram_stations):
+            data += bytes((-len(data)) % 4) + array('i', values).tobytes()
+        return data
+
+    @staticmethod
+    def unpack(names, buffer):
+        """Rebuild an index written by pack; the int arrays are views into buffer."""
+        stations, word_count, gram_count, posting_count, text_size = _HEADER.unpack_from(buffer)
+        offset = _HEADER.size
+        text = bytes(buffer[offset:offset + text_size]).decode("utf-8").split("\n") if text_size else []
+        offset += text_size
+        view = memoryview(buffer)
+        arrays = []
+        for count in (word_count, gram_count + 1, posting_count):
+            offset += (-offset) % 4
+            arrays.append(view[offset:offset + 4 * count].cast('i'))
+            offset += 4 * count
+        keys, words, grams = text[:stations], text[stations:stations + word_count], text[stations + word_count:]
+        return StationIndex(names, keys, words, arrays[0], grams, arrays[1], arrays[2])
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from network_loader import load_network
+
+    def levenshtein(a, b):
+        """Textbook dynamic-programming edit distance, to check edit_distance against."""
+        row = list(range(len(b) + 1))
+        for i, ca in enumerate(a, 1):
+            previous, row[0] = row[0], i
+            for j, cb in enumerate(b, 1):
+                previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ca != cb))
+        return row[-1]
+
+    random.seed(1828)
+    for _ in range(2000):
+        a = "".join(random.choice("abcde ") for _ in range(random.randint(0, 12)))
+        b = "".join(random.choice("abcde ") for _ in range(random.randint(0, 12)))
+        if edit_distance(_pattern_bits(a), len(a), b) != levenshtein(a, b):
+            raise RuntimeError(f"edit_distance({a!r}, {b!r}) is wrong")
+
+    network = load_network("London Underground Data.xlsx")
+    index = network.station_index()
+    copy = StationIndex.unpack(network.stations, index.pack())
+    if copy.keys != index.keys or copy.words != index.words or list(copy.gram_stations) != list(index.gram_stations):
+        raise RuntimeError("Packed index does not round-trip")
+
+    # Typos: the bigram filter must find exactly what a scan over every station finds.
+    queries = []
+    for name in random.sample(network.stations, 100):
+        key = list(normalise(name))
+        for _ in range(random.randint(1, 2)):
+            position = random.randrange(len(key))
+            key[position] = random.choice("abcdefghijklmnopqrstuvwxyz")
+        queries.append("".join(key))
+    for query in queries:
+        expected = sorted((levenshtein(query, key), station) for station, key in enumerate(index.keys)
+                          if levenshtein(query, key) <= 2)
+        if sorted(index.similar(query)) != expected:
+            raise RuntimeError(f"Typo lookup of {query!r} missed a station")
+
+    for label, func, arguments in (("find", index.find, network.stations),
+                                   ("complete", index.complete, [name[:4] for name in network.stations]),
+                                   ("similar", index.similar, queries)):
+        start = time.perf_counter()
+        for argument in arguments:
+            func(argument)
+        print(f"{label:>8}: {(time.perf_counter() - start) / len(arguments) * 1e6:.1f} us per lookup")
+
+    print([index.names[s] for s in index.complete("pancras")], [index.names[s] for s in index.complete("hammer")])
+    print(index.names[index.resolve("kings cros st pancras")], index.names[index.resolve("  BANK ")])
+    try:
+        index.resolve("Wimbeldon Prak")
+    except ValueError as error:
+        print(error)
+    try:
+        index.resolve("Harrow")
+        raise RuntimeError("A prefix of several stations resolved to one of them")
+    except ValueError as error:
+        if "Harrow & Wealdstone" not in str(error) or "Harrow-on-the-Hill" not in str(error):
+            raise RuntimeError(f"A prefix should suggest its completions: {error}")
+        print(error)
@@ -0,0 +1,166 @@
+import time
+import instrumentation
+
+
+def bfs_csr(G, source):
+    """
+    Count the stops from source to every station with a level-by-level breadth-first search.
+    Edge weights are ignored, so the journey-time graph can be used as it is; the closed arcs
+    of a without_edges view are skipped. Each level is scanned in increasing vertex order, so
+    every station's predecessor is its lowest-numbered neighbour one stop closer to the source;
+    bfs_bitset returns exactly the same tree. The distances match dijkstra on unit weights, but
+    where two routes have as few stops, dijkstra's heap may pick the other predecessor.
+    Arguments:
+        G -- the network as a CSRGraph (or a without_edges view of one)
+        source -- index of the source station
+    Returns:
+        dist -- number of stops from source (float('inf') if unreachable)
+        pi -- predecessors (None for the source and unreachable stations)
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    offsets, targets, closed = G.offsets, G.targets, G.closed
+    dist = [float('inf')] * G.card_V
+    pi = [None] * G.card_V
+    dist[source] = 0
+    frontier = [source]
+    level = 0
+    while frontier:
+        level += 1
+        next_frontier = []
+        for u in frontier:
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if pi[v] is None and v != source and i not in closed:  # v is being discovered now
+                    dist[v] = level
+                    pi[v] = u
+                    next_frontier.append(v)
+        next_frontier.sort()
+        frontier = next_frontier
+    if instrumentation.active:
+        # Every reached station is dequeued once and has all of its arcs scanned.
+        elapsed = time.perf_counter_ns() - start
+        reached = [u for u in range(G.card_V) if dist[u] != float('inf')]
+        instrumentation.record("bfs", elapsed, settled=len(reached), levels=level - 1,
+                               relaxations=sum(offsets[u + 1] - offsets[u] for u in reached))
+    return dist, pi
+
+
+class BitsetGraph:
+    """
+    Neighbourhoods of a graph stored as Python integers used as bitsets (bit v set if v is a
+    neighbour). Whole frontiers can then be intersected and merged with single big-integer
+    operations, which pays off on dense graphs such as the synthetic edge_probability=0.1 ones.
+    """
+
+    def __init__(self, G):
+        """Build the neighbour masks of a CSRGraph, leaving out the closed arcs of a without_edges view."""
+        self.card_V = G.get_card_V()
+        self.degree = [G.degree(u) for u in range(self.card_V)]
+        self.masks = []
+        for u in range(self.card_V):
+            mask = 0
+            for i in range(G.offsets[u], G.offsets[u + 1]):
+                if i not in G.closed:
+                    mask |= 1 << G.targets[i]
+            self.masks.append(mask)
+
+
+def _members(bits):
+    """Yield the positions of the set bits, lowest first."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def bfs_bitset(B, source, alpha=14):
+    """
+    Direction-optimising breadth-first search over a BitsetGraph.
+    A level is expanded top-down (merge the masks of the frontier) while the frontier's edges
+    are few, and bottom-up (test each unvisited vertex's mask against the frontier) once they
+    outnumber the unvisited vertices' edges divided by alpha.
+    Arguments:
+        B -- the BitsetGraph
+        source -- index of the source station
+        alpha -- switching threshold between the two directions
+    Returns:
+        dist, pi -- as returned by bfs_csr
+    """
+    start = time.perf_counter_ns() if instrumentation.active else 0
+    masks, degree = B.masks, B.degree
+    bottom_up = 0
+    dist = [float('inf')] * B.card_V
+    pi = [None] * B.card_V
+    dist[source] = 0
+    frontier = 1 << source
+    unvisited = ((1 << B.card_V) - 1) ^ frontier
+    unvisited_edges = sum(degree) - degree[source]
+    level = 0
+    while frontier and unvisited:
+        level += 1
+        frontier_list = list(_members(frontier))
+        frontier_edges = sum(degree[u] for u in frontier_list)
+        if frontier_edges * alpha > unvisited_edges:  # bottom-up: who touches the frontier?
+            bottom_up += 1
+            discovered = 0
+            for v in _members(unvisited):
+                if masks[v] & frontier:
+                    discovered |= 1 << v
+        else:  # top-down: everything next to the frontier that is still unvisited
+            reached = 0
+            for u in frontier_list:
+                reached |= masks[u]
+            discovered = reached & unvisited
+        for v in _members(discovered):
+            touching = masks[v] & frontier
+            pi[v] = (touching & -touching).bit_length() - 1  # lowest-numbered frontier neighbour
+            dist[v] = level
+            unvisited_edges -= degree[v]
+        unvisited ^= discovered
+        frontier = discovered
+    if instrumentation.active:
+        instrumentation.record("bfs-bitset", time.perf_counter_ns() - start,
+                               settled=B.card_V - bin(unvisited).count("1"), levels=level, bottom_up_levels=bottom_up)
+    return dist, pi
+
+
+# Testing
+if __name__ == "__main__":
+
+    import random
+    import time
+    from csr_graph import CSRGraph, dijkstra_csr
+    from network_loader import load_network
+
+    def compare(name, graph, sources, closed_sections=()):
+        """Check both BFS engines against Dijkstra on unit weights and time them, with some sections closed."""
+        unit = graph.with_unit_weights().without_edges(closed_sections)
+        graph = graph.without_edges(closed_sections) if closed_sections else graph
+        bitset_graph = BitsetGraph(graph)
+        timings = {"dijkstra (unit weights)": 0.0, "bfs_csr": 0.0, "bfs_bitset": 0.0}
+        for source in sources:
+            start = time.perf_counter()
+            reference, _ = dijkstra_csr(unit, source)
+            middle = time.perf_counter()
+            dist, pi = bfs_csr(graph, source)
+            end = time.perf_counter()
+            bitset_dist, bitset_pi = bfs_bitset(bitset_graph, source)
+            timings["dijkstra (unit weights)"] += middle - start
+            timings["bfs_csr"] += end - middle
+            timings["bfs_bitset"] += time.perf_counter() - end
+            if dist != reference or bitset_dist != reference or bitset_pi != pi:
+                raise RuntimeError(f"{name}: engines disagree for source {source}")
+        print(f"{name}: {len(sources)} sources agree")
+        for label, total in timings.items():
+            print(f"    {label:>24}: {total / len(sources) * 1000:.3f} ms per source")
+
+    random.seed(1828)
+    network = load_network("London Underground Data.xlsx")
+    compare("London Underground", network.graph(), range(network.get_card_V()))
+    closed_sections = [(u, v) for u, v, _ in random.sample(list(network.edges()), 40)]
+    compare("London Underground with 40 sections closed", network.graph(), range(network.get_card_V()),
+            closed_sections)
+    for n in (1000, 2000):
+        edge_list = [(u, v, 1) for u in range(n) for v in range(u + 1, n) if random.random() < 0.1]
+        compare(f"Synthetic network (n = {n}, edge_probability = 0.1)", CSRGraph.from_edges(n, edge_list),
+                random.sample(range(n), 20))